@@ -0,0 +1,131 @@
+"""
+backfill.py.
+
+Первичная загрузка истории статусов для новых арендаторов.
+Вся история (from_date=0) запрашивается параллельно для нескольких
+арендаторов с ограничением числа одновременных запросов, статусы
+загружаются в состояние бота без рассылки сообщений по каждой работе.
+"""
+import logging
+import time
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import constants as const
+import history
+import state
+
+BACKFILL_CONCURRENCY = 4
+BACKFILL_BATCH = 1000
+
+
+def seed_statuses(tenant: str, tenant_state: state.TenantState,
+                  homeworks: list) -> tuple:
+    """
+    Загрузка последних статусов работ в состояние арендатора.
+
+    Работы с отсутствующими ключами или неизвестным статусом пропускаются
+    Возвращает (Counter статусов, число пропущенных, строки истории)
+    """
+    latest = {}
+    rows = []
+    skipped = 0
+    now = int(time.time())
+    for homework in homeworks:
+        if (not isinstance(homework, dict)
+                or not const.HOMEWORK_KEYS <= homework.keys()
+                or homework['status'] not in const.HOMEWORK_STATUSES):
+            skipped += 1
+            continue
+        updated_at = history.parse_date(homework.get('date_updated'), now)
+        homework_name = homework['homework_name']
+        rows.append(
+            (tenant, homework_name, homework['status'], updated_at, now)
+        )
+        known = latest.get(homework_name)
+        if known is None or known[0] <= updated_at:
+            latest[homework_name] = (updated_at, homework['status'])
+
+    for homework_name, (_, status) in latest.items():
+        tenant_state.statuses[homework_name] = status
+    return Counter(status for _, status in latest.values()), skipped, rows
+
+
+def backfill_tenant(tenant: str, fetch, bot_state: state.BotState) -> tuple:
+    """
+    Загрузка всей истории одного арендатора.
+
+    fetch(from_date) -> dict - запрос к API от имени арендатора
+    Возвращает (итог, строки истории)
+    """
+    response = fetch(0)
+    homeworks = response.get('homeworks')
+    if not isinstance(homeworks, list):
+        raise TypeError(f'{const.LOG_MESSAGES["wrong_type"]}: {response}')
+
+    tenant_state = bot_state.get(tenant)
+    statuses, skipped, rows = seed_statuses(tenant, tenant_state, homeworks)
+    tenant_state.timestamp = response.get('current_date') or int(time.time())
+    summary = {
+        'homeworks': sum(statuses.values()),
+        'statuses': statuses,
+        'skipped': skipped,
+    }
+    return summary, rows
+
+
+def backfill(tenants: dict, bot_state: state.BotState,
+             history_store: history.HistoryStore = None,
+             concurrency: int = BACKFILL_CONCURRENCY,
+             batch_size: int = BACKFILL_BATCH) -> dict:
+    """
+    Первичная загрузка истории для арендаторов.
+
+    tenants - {tenant: fetch}, запросы выполняются не более чем
+    в concurrency потоков. История записывается в history_store
+    пачками по batch_size строк из основного потока
+    Возвращает {tenant: итог}; при ошибке итог содержит ключ error
+    """
+    summaries = {}
+    if not tenants:
+        return summaries
+    workers = max(1, min(concurrency, len(tenants)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(backfill_tenant, tenant, fetch, bot_state): tenant
+            for tenant, fetch in tenants.items()
+        }
+        for future in as_completed(futures):
+            tenant = futures[future]
+            try:
+                summary, rows = future.result()
+            except Exception as error:
+                logging.error(
+                    f'{const.LOG_MESSAGES["backfill_failed"]} '
+                    f'{tenant}: {error}'
+                )
+                summaries[tenant] = {'error': str(error)}
+                continue
+            if history_store is not None:
+                for start in range(0, len(rows), batch_size):
+                    history_store.add_many(rows[start:start + batch_size])
+            summaries[tenant] = summary
+    return summaries
+
+
+def summary_message(summary: dict) -> str:
+    """Итоговое сообщение о загруженной истории."""
+    if 'error' in summary:
+        return f'{const.LOG_MESSAGES["backfill_failed"]}: {summary["error"]}'
+    statuses = ', '.join(
+        f'{status}: {count}'
+        for status, count in sorted(summary['statuses'].items())
+    )
+    message = (
+        f'{const.LOG_MESSAGES["backfill_done"]}: '
+        f'{summary["homeworks"]} работ'
+    )
+    if statuses:
+        message = f'{message} ({statuses})'
+    return message
@@ -0,0 +1 @@
+"""Бенчмарки homework_bot."""
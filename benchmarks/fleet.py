@@ -0,0 +1,561 @@
+"""
+Нагрузочный прогон синтетического парка арендаторов.
+
+Заглушка API в отдельном процессе ведёт работы N арендаторов, меняя
+их статусы пуассоновским потоком событий с заданной частотой, и
+принимает уведомления webhook. Бот опрашивает её циклом poll_once
+из нескольких потоков по расписанию с интервалом --interval в течение
+--duration секунд для каждого значения N.
+Отчёт о ёмкости: процессорное время и задержка опроса, отставание
+от расписания, память на арендатора (tracemalloc, отдельный прогон
+той же длительности), арендаторов на ядро при интервале RETRY_TIME
+и задержка опроса, при которой опрос перестаёт успевать за расписанием.
+
+Запуск:
+    python -m benchmarks.fleet --tenants 100 200 400 --duration 30
+"""
+import argparse
+import contextlib
+import gc
+import heapq
+import json
+import logging
+import math
+import multiprocessing
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import join
+from urllib.parse import parse_qs, urlsplit
+
+import history
+import homework
+import notifiers
+import ratelimit
+import response_cache
+import state
+
+TENANTS = (50, 100, 200)
+DURATION = 10.0
+INTERVAL = 1.0
+WORKERS = 8
+EVENT_RATE = 6.0
+API_LATENCY = 0.0
+MAX_LAG_SHARE = 0.1
+
+UNLIMITED = 1e12
+
+REVIEWED_STATUSES = ('approved', 'rejected')
+
+
+class FleetAPI:
+    """
+    Работы синтетических арендаторов.
+
+    event_rate - среднее число событий проверки на арендатора в секунду:
+    новая работа уходит на проверку или проверенная получает вердикт
+    """
+
+    def __init__(self, event_rate: float, seed: int = 0) -> None:
+        """Создание пустого парка."""
+        self.event_rate = event_rate
+        self._random = random.Random(seed)
+        self._tenants = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.events = 0
+        self.notifications = 0
+
+    def _next_event(self, now: float) -> float:
+        if self.event_rate <= 0:
+            return math.inf
+        return now + self._random.expovariate(self.event_rate)
+
+    def _advance(self, tenant: dict, now: float) -> None:
+        homeworks = tenant['homeworks']
+        while tenant['next_event'] <= now:
+            event_at = tenant['next_event']
+            reviewing = [
+                item for item in homeworks.values()
+                if item[0]['status'] == 'reviewing'
+            ]
+            if reviewing and self._random.random() < 0.5:
+                item = self._random.choice(reviewing)
+                item[0]['status'] = self._random.choice(REVIEWED_STATUSES)
+            else:
+                name = f'student__hw{len(homeworks):05d}.zip'
+                item = homeworks[name] = [{
+                    'id': len(homeworks),
+                    'homework_name': name,
+                    'status': 'reviewing',
+                    'reviewer_comment': '',
+                    'lesson_name': 'Синтетический проект',
+                }, 0]
+            item[0]['date_updated'] = datetime.fromtimestamp(
+                event_at, timezone.utc
+            ).strftime('%Y-%m-%dT%H:%M:%SZ')
+            item[1] = int(event_at)
+            self.events += 1
+            tenant['next_event'] = self._next_event(event_at)
+
+    def answer(self, tenant_name: str, from_date: int,
+               now: float = None) -> dict:
+        """Ответ API: работы арендатора, изменившиеся с from_date."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self.requests += 1
+            tenant = self._tenants.get(tenant_name)
+            if tenant is None:
+                tenant = self._tenants[tenant_name] = {
+                    'homeworks': {}, 'next_event': self._next_event(now),
+                }
+            self._advance(tenant, now)
+            return {
+                'homeworks': [
+                    dict(item) for item, updated
+                    in tenant['homeworks'].values() if updated >= from_date
+                ],
+                'current_date': int(now),
+            }
+
+    def notify(self) -> None:
+        """Учёт доставленного уведомления."""
+        with self._lock:
+            self.notifications += 1
+
+    def stats(self) -> dict:
+        """Счётчики заглушки."""
+        with self._lock:
+            return {
+                'tenants': len(self._tenants),
+                'requests': self.requests,
+                'events': self.events,
+                'notifications': self.notifications,
+            }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """GET / - API, POST /webhook - уведомления, GET /stats - счётчики."""
+
+    def _reply(self, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        """Ответ API или счётчики заглушки."""
+        api = self.server.api
+        url = urlsplit(self.path)
+        if url.path == '/stats':
+            self._reply(api.stats())
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        tenant = self.headers.get('Authorization', '').partition(' ')[2]
+        from_date = int(parse_qs(url.query).get('from_date', ['0'])[0])
+        self._reply(api.answer(tenant, from_date))
+
+    def do_POST(self) -> None:
+        """Приём уведомления webhook."""
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.api.notify()
+        self._reply({'ok': True})
+
+    def log_message(self, format: str, *args) -> None:
+        """Журнал запросов заглушки не пишется."""
+
+
+def serve(ports, event_rate: float, latency: float) -> None:
+    """Запуск заглушки; порт передаётся в очередь ports."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.api = FleetAPI(event_rate)
+    server.latency = latency
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+
+@contextlib.contextmanager
+def stub_server(event_rate: float = EVENT_RATE,
+                latency: float = API_LATENCY):
+    """Заглушка API в отдельном процессе. Возвращает её базовый URL."""
+    context = multiprocessing.get_context('spawn')
+    ports = context.Queue()
+    process = context.Process(
+        target=serve, args=(ports, event_rate, latency), daemon=True
+    )
+    process.start()
+    try:
+        yield f'http://127.0.0.1:{ports.get(timeout=30)}/'
+    finally:
+        process.terminate()
+        process.join()
+
+
+def stub_stats(url: str) -> dict:
+    """Счётчики заглушки."""
+    import requests
+
+    return requests.get(f'{url}stats', timeout=homework.API_TIMEOUT).json()
+
+
+@contextlib.contextmanager
+def stub_bot(url: str, api_rate: float = UNLIMITED):
+    """Подмена адреса API, ограничителя частоты и кеша ответов бота."""
+    original_endpoint = homework.ENDPOINT
+    original_limiter = homework.rate_limiter
+    original_cache = homework.api_cache
+    homework.ENDPOINT = url
+    homework.rate_limiter = ratelimit.RateLimiter(
+        rate=api_rate, max_rate=api_rate, burst=max(1.0, api_rate)
+    )
+    homework.api_cache = response_cache.ResponseCache()
+    try:
+        yield
+    finally:
+        homework.ENDPOINT = original_endpoint
+        homework.rate_limiter = original_limiter
+        homework.api_cache = original_cache
+
+
+def measure_memory(run, tenant_count: int) -> float:
+    """
+    Память на арендатора, байт.
+
+    Прирост выделенной памяти по tracemalloc за прогон run() по
+    расписанию, после которого у арендаторов накоплены статусы работ,
+    отпечатки ответов и буферы истории
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        run()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return max(0, after - before) / tenant_count
+
+
+def run_schedule(poll_tenant, tenants: list, interval: float,
+                 duration: float, workers: int) -> dict:
+    """
+    Опрос арендаторов по расписанию в течение duration секунд.
+
+    Опросы арендаторов равномерно распределены по интервалу, следующий
+    опрос назначается через interval после запланированного времени
+    предыдущего. Потоки берут ближайший по расписанию опрос
+    Возвращает задержки опросов, отставания от расписания и ошибки
+    """
+    started = time.monotonic()
+    deadline = started + duration
+    schedule = [
+        (started + interval * number / len(tenants), tenant)
+        for number, tenant in enumerate(tenants)
+    ]
+    heapq.heapify(schedule)
+    condition = threading.Condition()
+    latencies = []
+    lags = []
+    errors = []
+
+    def worker():
+        while True:
+            with condition:
+                while True:
+                    due, tenant = schedule[0]
+                    if due >= deadline:
+                        return
+                    delay = due - time.monotonic()
+                    if delay <= 0:
+                        heapq.heappop(schedule)
+                        break
+                    condition.wait(delay)
+            polled = time.monotonic()
+            try:
+                poll_tenant(tenant)
+            except Exception as error:
+                errors.append(error)
+            finished = time.monotonic()
+            with condition:
+                lags.append(polled - due)
+                latencies.append(finished - polled)
+                heapq.heappush(schedule, (due + interval, tenant))
+                condition.notify()
+
+    cpu_started = time.process_time()
+    threads = [
+        threading.Thread(target=worker, name=f'fleet-{number}')
+        for number in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        'wall': time.monotonic() - started,
+        'cpu': time.process_time() - cpu_started,
+        'latencies': latencies,
+        'lags': lags,
+        'errors': len(errors),
+    }
+
+
+def run_step(url: str, tenant_count: int, interval: float = INTERVAL,
+             duration: float = DURATION, workers: int = WORKERS,
+             api_rate: float = UNLIMITED, prefix: str = 'tenant') -> dict:
+    """
+    Прогон парка из tenant_count арендаторов против заглушки url.
+
+    Первый прогон по расписанию идёт под tracemalloc и замеряет память,
+    второй (без tracemalloc) - процессорное время и задержки
+
+    Возвращает замеры шага: опросы, процессорное время, память на
+    арендатора, распределения задержек и отставаний (мс), уведомления
+    """
+    if tenant_count < 1:
+        raise ValueError(f'Число арендаторов должно быть больше 0: '
+                         f'{tenant_count}')
+    tenants = [f'{prefix}-{number:06d}' for number in range(tenant_count)]
+    bot_state = state.BotState()
+    dispatcher = notifiers.Dispatcher(
+        [notifiers.WebhookNotifier(f'{url}webhook', retries=0)]
+    )
+    stats_before = stub_stats(url)
+    with tempfile.TemporaryDirectory() as directory, stub_bot(url, api_rate):
+        history_store = history.HistoryStore(
+            join(directory, 'history.sqlite3')
+        )
+
+        def poll_tenant(tenant):
+            homework.poll_once(
+                dispatcher,
+                tenant,
+                bot_state.get(tenant),
+                {'Authorization': f'OAuth {tenant}'},
+                history_store,
+            )
+
+        def scheduled():
+            return run_schedule(
+                poll_tenant, tenants, interval, duration, workers
+            )
+
+        memory = measure_memory(scheduled, tenant_count)
+        result = scheduled()
+        undelivered = dispatcher.close(homework.DRAIN_TIMEOUT)
+        history_store.close()
+        cache = homework.api_cache.metrics()
+    stats_after = stub_stats(url)
+
+    polls = len(result['latencies'])
+    return {
+        'tenants': tenant_count,
+        'workers': workers,
+        'interval': interval,
+        'polls': polls,
+        'errors': result['errors'],
+        'cpu': result['cpu'],
+        'wall': result['wall'],
+        'cpu_per_poll': result['cpu'] / polls if polls else math.inf,
+        'memory_per_tenant': memory,
+        'latency_ms': history.describe(
+            [value * 1000 for value in result['latencies']]
+        ),
+        'lag_ms': history.describe(
+            [value * 1000 for value in result['lags']]
+        ),
+        'cache_hits': cache['hits'],
+        'events': stats_after['events'] - stats_before['events'],
+        'notifications': (
+            stats_after['notifications'] - stats_before['notifications']
+        ),
+        'undelivered': len(undelivered),
+    }
+
+
+def behind(step: dict, max_lag_share: float = MAX_LAG_SHARE) -> bool:
+    """Отстаёт ли опрос от расписания: p99 отставания больше доли интервала."""
+    lag = step['lag_ms']
+    return not lag['count'] or (
+        lag['p99'] > step['interval'] * max_lag_share * 1000
+    )
+
+
+def latency_budget(tenants: int, workers: int, interval: float) -> float:
+    """
+    Задержка опроса (мс), при которой потоки перестают успевать.
+
+    За интервал workers потоков успевают workers * interval секунд опросов
+    """
+    return workers * interval / tenants * 1000
+
+
+def capacity(steps: list, retry_time: float = homework.RETRY_TIME,
+             max_lag_share: float = MAX_LAG_SHARE) -> dict:
+    """
+    Оценка ёмкости по шагам прогона.
+
+    tenants_per_core - арендаторов на ядро при интервале retry_time
+    по процессорному времени опроса; max_sustainable - наибольший парк,
+    опрос которого успевает за расписанием; behind_latency_ms - задержка
+    опроса на первом отстающем шаге (или None); api_limit_tenants -
+    предел по ограничителю частоты API боевой конфигурации
+    """
+    sustainable = [
+        step for step in steps if not behind(step, max_lag_share)
+    ]
+    lagging = [step for step in steps if behind(step, max_lag_share)]
+    measured = [step for step in steps if step['polls']]
+    cpu_per_poll = (
+        sum(step['cpu'] for step in measured)
+        / sum(step['polls'] for step in measured)
+        if measured else math.inf
+    )
+    first_behind = min(lagging, key=lambda step: step['tenants'], default=None)
+    largest = max(sustainable, key=lambda step: step['tenants'], default=None)
+    return {
+        'cpu_per_poll_ms': cpu_per_poll * 1000,
+        'tenants_per_core': retry_time / cpu_per_poll if cpu_per_poll else 0,
+        'max_sustainable': largest['tenants'] if largest else 0,
+        'max_sustainable_per_core': (
+            largest['tenants'] * largest['wall'] / largest['cpu']
+            if largest and largest['cpu'] else 0
+        ),
+        'memory_per_tenant': max(
+            (step['memory_per_tenant'] for step in steps), default=0
+        ),
+        'behind_at_tenants': first_behind['tenants'] if first_behind else None,
+        'behind_latency_ms': (
+            first_behind['latency_ms'].get('p50') if first_behind else None
+        ),
+        'latency_budget_ms': latency_budget(
+            largest['tenants'], largest['workers'], retry_time
+        ) if largest else None,
+        'api_limit_tenants': homework.API_MAX_RATE * retry_time,
+    }
+
+
+def report(steps: list, summary: dict) -> str:
+    """Таблица шагов и итоговая оценка ёмкости."""
+    lines = [
+        f'{"tenants":>8}{"polls":>8}{"errors":>7}{"cpu %":>7}'
+        f'{"cpu ms/poll":>12}{"p50 ms":>8}{"p99 ms":>8}'
+        f'{"lag p99 ms":>11}{"budget ms":>10}{"KiB/tenant":>11}'
+        f'{"events":>7}{"sent":>6}  status'
+    ]
+    for step in steps:
+        latency = step['latency_ms']
+        lag = step['lag_ms']
+        budget = latency_budget(
+            step['tenants'], step['workers'], step['interval']
+        )
+        lines.append(
+            f'{step["tenants"]:>8}{step["polls"]:>8}{step["errors"]:>7}'
+            f'{100 * step["cpu"] / step["wall"]:>7.1f}'
+            f'{step["cpu_per_poll"] * 1000:>12.2f}'
+            f'{latency.get("p50", 0):>8.1f}{latency.get("p99", 0):>8.1f}'
+            f'{lag.get("p99", 0):>11.1f}{budget:>10.1f}'
+            f'{step["memory_per_tenant"] / 1024:>11.1f}'
+            f'{step["events"]:>7}{step["notifications"]:>6}'
+            f'  {"behind" if behind(step) else "ok"}'
+        )
+    lines.append('')
+    lines.append(
+        f'процессорное время опроса: {summary["cpu_per_poll_ms"]:.2f} мс; '
+        f'арендаторов на ядро при интервале {homework.RETRY_TIME} с: '
+        f'{summary["tenants_per_core"]:.0f}'
+    )
+    lines.append(
+        f'наибольший парк без отставания: {summary["max_sustainable"]} '
+        f'(~{summary["max_sustainable_per_core"]:.0f} на ядро '
+        f'при интервале {steps[0]["interval"]} с)'
+    )
+    lines.append(
+        f'память на арендатора: {summary["memory_per_tenant"] / 1024:.1f} KiB'
+    )
+    if summary['behind_at_tenants'] is None:
+        lines.append('опрос успевает за расписанием на всех шагах')
+    else:
+        lines.append(
+            f'опрос отстаёт от расписания с {summary["behind_at_tenants"]} '
+            f'арендаторов при задержке опроса '
+            f'{summary["behind_latency_ms"]:.1f} мс (p50)'
+        )
+    if summary['latency_budget_ms'] is not None:
+        lines.append(
+            f'при интервале {homework.RETRY_TIME} с парк из '
+            f'{summary["max_sustainable"]} арендаторов отстанет при задержке '
+            f'опроса выше {summary["latency_budget_ms"]:.0f} мс'
+        )
+    lines.append(
+        f'предел ограничителя частоты API: '
+        f'{summary["api_limit_tenants"]:.0f} арендаторов'
+    )
+    return '\n'.join(lines)
+
+
+def positive_int(value: str) -> int:
+    """Аргумент командной строки: целое число больше 0."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(
+            f'ожидается число больше 0: {value}'
+        )
+    return number
+
+
+def main(argv=None) -> int:
+    """Прогон парка по шагам и печать отчёта о ёмкости."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tenants', type=positive_int, nargs='+',
+                        default=TENANTS)
+    parser.add_argument('--duration', type=float, default=DURATION,
+                        help='секунд на шаг')
+    parser.add_argument('--interval', type=float, default=INTERVAL,
+                        help='интервал опроса арендатора, с')
+    parser.add_argument('--workers', type=positive_int, default=WORKERS)
+    parser.add_argument('--event-rate', type=float, default=EVENT_RATE,
+                        help='событий проверки на арендатора в минуту')
+    parser.add_argument('--api-latency', type=float, default=API_LATENCY,
+                        help='задержка ответа заглушки API, мс')
+    parser.add_argument('--api-rate', type=float, default=UNLIMITED,
+                        help='ограничение запросов к API в секунду')
+    parser.add_argument('--json', action='store_true',
+                        help='вывод замеров в JSON')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.ERROR)
+    steps = []
+    with stub_server(args.event_rate / 60, args.api_latency / 1000) as url:
+        for number, tenant_count in enumerate(args.tenants):
+            steps.append(run_step(
+                url,
+                tenant_count,
+                interval=args.interval,
+                duration=args.duration,
+                workers=args.workers,
+                api_rate=args.api_rate,
+                prefix=f'step{number}',
+            ))
+    summary = capacity(steps)
+    if args.json:
+        print(json.dumps({'steps': steps, 'capacity': summary}, indent=2))
+    else:
+        print(report(steps, summary))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,306 @@
+"""
+Микро-бенчмарки горячего пути разбора и проверки ответа API.
+
+Синтетические ответы на 1, 100 и 10000 работ (каждая десятая
+некорректна) прогоняются через check_response, parse_status,
+parse_statuses, get_api_answer, poll_api_answer и send_new_statuses.
+Сеть и рассылка заменены заглушками, ограничитель частоты отключён.
+Работы с фиксированной стоимостью (check_response) и ответы меньше
+PER_ITEM_MIN_SIZE работ сравниваются по времени вызова, остальные - по
+времени на работу. Регрессия засчитывается, если рост выше THRESHOLD
+и больше NOISE_FLOOR_NS на вызов, и подтверждается повторными замерами.
+
+Запуск:
+    python -m benchmarks.hot_path            сравнение с базовой линией
+    python -m benchmarks.hot_path --update   запись новой базовой линии
+"""
+import argparse
+import contextlib
+import gc
+import json
+import statistics
+import sys
+import time
+
+from os.path import abspath, dirname, join
+
+import homework
+import ratelimit
+import response_cache
+import state
+
+BASELINE_PATH = join(dirname(abspath(__file__)), 'hot_path_baseline.json')
+SIZES = (1, 100, 10_000)
+MALFORMED_EVERY = 10
+WARMUP = 3
+REPEAT = 15
+MIN_SAMPLE_NS = 2_000_000
+THRESHOLD = 0.5
+NOISE_FLOOR_NS = 1_000
+PER_ITEM_MIN_SIZE = 100
+FIXED_COST_CASES = frozenset({'check_response'})
+CONFIRM_RUNS = 2
+
+UNLIMITED = 1e12
+
+STATUSES = ('approved', 'reviewing', 'rejected')
+
+
+def make_payload(size: int) -> dict:
+    """Синтетический ответ API: каждая MALFORMED_EVERY-я работа испорчена."""
+    homeworks = []
+    for number in range(size):
+        homework_item = {
+            'id': number,
+            'homework_name': f'student__hw{number:05d}.zip',
+            'status': STATUSES[number % len(STATUSES)],
+            'reviewer_comment': 'Всё нравится',
+            'date_updated': '2020-02-13T14:40:57Z',
+            'lesson_name': 'Итоговый проект',
+        }
+        if number % MALFORMED_EVERY == MALFORMED_EVERY - 1:
+            if number % (2 * MALFORMED_EVERY) < MALFORMED_EVERY:
+                del homework_item['status']
+            else:
+                homework_item['status'] = 'unknown'
+        homeworks.append(homework_item)
+    return {'homeworks': homeworks, 'current_date': 1000198991}
+
+
+def measure(func, warmup: int = WARMUP, repeat: int = REPEAT,
+            min_sample_ns: int = MIN_SAMPLE_NS) -> dict:
+    """
+    Замер времени вызова func.
+
+    После прогрева число вызовов в одном замере подбирается так, чтобы
+    замер длился не меньше min_sample_ns; сборщик мусора отключён
+    Возвращает статистику времени одного вызова в наносекундах
+    """
+    for _ in range(warmup):
+        func()
+
+    number = 1
+    while True:
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        if time.perf_counter_ns() - started >= min_sample_ns:
+            break
+        number *= 2
+
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter_ns()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter_ns() - started) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {
+        'min_ns': min(samples),
+        'median_ns': statistics.median(samples),
+        'mean_ns': statistics.fmean(samples),
+        'stdev_ns': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'calls_per_sample': number,
+    }
+
+
+class StubResponse:
+    """Ответ API без сети."""
+
+    def __init__(self, payload: dict) -> None:
+        """Подготовка тела ответа."""
+        self._payload = payload
+        self.content = json.dumps(payload).encode()
+        self.status_code = 200
+        self.headers = {'Content-Length': str(len(self.content))}
+
+    def json(self) -> dict:
+        """Декодирование тела, как у requests.Response."""
+        return json.loads(self.content)
+
+
+class NullDispatcher:
+    """Рассылка без доставки."""
+
+    def dispatch(self, message: str) -> list:
+        """Сообщение отбрасывается."""
+        return []
+
+
+@contextlib.contextmanager
+def stub_api(payload: dict):
+    """Подмена requests.get и ограничителя частоты на время замеров."""
+    import requests
+
+    response = StubResponse(payload)
+    original_get = requests.get
+    original_limiter = homework.rate_limiter
+    original_cache = homework.api_cache
+    requests.get = lambda *args, **kwargs: response
+    homework.rate_limiter = ratelimit.RateLimiter(
+        rate=UNLIMITED, max_rate=UNLIMITED, burst=UNLIMITED
+    )
+    homework.api_cache = response_cache.ResponseCache()
+    try:
+        yield
+    finally:
+        requests.get = original_get
+        homework.rate_limiter = original_limiter
+        homework.api_cache = original_cache
+
+
+def cases(payload: dict) -> dict:
+    """Замеряемые функции для одного ответа."""
+    homeworks = payload['homeworks']
+    valid, _ = homework.parse_statuses(homeworks)
+    valid = [homework_item for homework_item, _ in valid]
+    known = state.TenantState(statuses={
+        homework_item['homework_name']: homework_item['status']
+        for homework_item in valid[::2]
+    })
+    dispatcher = NullDispatcher()
+
+    def parse_status_loop():
+        for homework_item in valid:
+            homework.parse_status(homework_item)
+
+    def poll_unchanged():
+        _, body_fingerprint = homework.poll_api_answer(0, {}, 'unchanged')
+        homework.api_cache.remember('unchanged', body_fingerprint)
+
+    def send_new_statuses():
+        tenant_state = state.TenantState(statuses=dict(known.statuses))
+        homework.send_new_statuses(dispatcher, tenant_state, homeworks)
+
+    return {
+        'check_response': lambda: homework.check_response(payload),
+        'parse_status': parse_status_loop,
+        'parse_statuses': lambda: homework.parse_statuses(homeworks),
+        'get_api_answer': lambda: homework.get_api_answer(0),
+        'poll_api_answer_changed': lambda: homework.poll_api_answer(
+            0, {}, 'changed'
+        ),
+        'poll_api_answer_unchanged': poll_unchanged,
+        'send_new_statuses': send_new_statuses,
+    }
+
+
+def run(sizes=SIZES, names=None, **measure_kwargs) -> dict:
+    """
+    Прогон замеров (всех или только names).
+
+    Возвращает {case: {size: статистика}}; per_item_ns - минимальное
+    (наименее зашумлённое) время вызова, делённое на число работ в ответе
+    """
+    results = {}
+    for size in sizes:
+        payload = make_payload(size)
+        with stub_api(payload):
+            for name, func in cases(payload).items():
+                if names is not None and name not in names:
+                    continue
+                stats = measure(func, **measure_kwargs)
+                stats['per_item_ns'] = stats['min_ns'] / size
+                results.setdefault(name, {})[str(size)] = stats
+    return results
+
+
+def metric(name: str, size: str) -> str:
+    """Показатель сравнения: время вызова или время на работу."""
+    if name in FIXED_COST_CASES or int(size) < PER_ITEM_MIN_SIZE:
+        return 'min_ns'
+    return 'per_item_ns'
+
+
+def compare(results: dict, baseline: dict, threshold: float = THRESHOLD,
+            noise_floor_ns: float = NOISE_FLOOR_NS) -> list:
+    """
+    Замеры, стоимость которых выросла больше чем на threshold.
+
+    Рост вызова меньше noise_floor_ns считается шумом
+    Возвращает список (case, size, описание)
+    """
+    regressions = []
+    for name, by_size in results.items():
+        for size, stats in by_size.items():
+            expected = baseline.get(name, {}).get(size)
+            if expected is None:
+                continue
+            key = metric(name, size)
+            unit = 'вызов' if key == 'min_ns' else 'работа'
+            if stats[key] <= expected[key] * (1 + threshold):
+                continue
+            if stats['min_ns'] - expected['min_ns'] <= noise_floor_ns:
+                continue
+            regressions.append((
+                name,
+                size,
+                f'{name}[{size}]: {stats[key]:.1f} ns/{unit}, '
+                f'базовая линия {expected[key]:.1f} ns',
+            ))
+    return regressions
+
+
+def report(results: dict) -> str:
+    """Таблица результатов."""
+    lines = [
+        f'{"case":<28}{"size":>7}{"median us":>12}'
+        f'{"stdev %":>9}{"ns/item":>10}'
+    ]
+    for name, by_size in results.items():
+        for size, stats in by_size.items():
+            stdev = 100 * stats['stdev_ns'] / stats['median_ns']
+            lines.append(
+                f'{name:<28}{size:>7}{stats["median_ns"] / 1000:>12.2f}'
+                f'{stdev:>9.1f}{stats["per_item_ns"]:>10.1f}'
+            )
+    return '\n'.join(lines)
+
+
+def main(argv=None) -> int:
+    """Запуск замеров, сравнение или обновление базовой линии."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update', action='store_true')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = parser.parse_args(argv)
+
+    results = run()
+    print(report(results))
+
+    if args.update:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+        print(f'Базовая линия записана: {args.baseline}')
+        return 0
+
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        print(f'Нет базовой линии {args.baseline}, запустите с --update')
+        return 1
+
+    regressions = compare(results, baseline, args.threshold)
+    for _ in range(CONFIRM_RUNS):
+        if not regressions:
+            break
+        retry = run(names={name for name, _, _ in regressions})
+        for name, by_size in retry.items():
+            for size, stats in by_size.items():
+                if stats['min_ns'] < results[name][size]['min_ns']:
+                    results[name][size] = stats
+        regressions = compare(results, baseline, args.threshold)
+
+    for _, _, regression in regressions:
+        print(f'FAIL: {regression}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
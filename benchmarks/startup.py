@@ -0,0 +1,109 @@
+"""
+Бенчмарк времени старта homework_bot.
+
+Запускает `python -X importtime -c "import homework"` в отдельном процессе
+и печатает отчёт о самых медленных импортах.
+Завершается с ошибкой, если при старте загружены тяжёлые модули
+(dotenv допустим, если в каталоге проекта есть env-файл)
+или превышен бюджет времени импорта.
+
+Запуск: python -m benchmarks.startup
+"""
+import os
+import subprocess
+import sys
+
+from os.path import abspath, dirname, join
+
+ROOT_DIR = dirname(dirname(abspath(__file__)))
+
+MODULE = 'homework'
+ENV_FILE = '.env'
+HEAVY_MODULES = ('telegram', 'requests', 'dotenv', 'numpy')
+IMPORT_BUDGET_US = 100_000
+REPORT_TOP = 10
+
+FAKE_ENV = {
+    'PRACTICUM_TOKEN': 'startup-benchmark',
+    'TELEGRAM_TOKEN': '1234:startup-benchmark',
+    'TELEGRAM_CHAT_ID': '12345',
+}
+
+
+def measure_imports(module: str = MODULE) -> list:
+    """
+    Импорт модуля в чистом интерпретаторе с -X importtime.
+
+    Возвращает список кортежей (self_us, cumulative_us, имя модуля)
+    """
+    env = dict(os.environ, **FAKE_ENV)
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT_DIR,
+        env=env,
+        stderr=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        text=True,
+        check=True,
+    )
+    records = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue
+        records.append((int(self_us), int(cumulative_us), name.strip()))
+    return records
+
+
+def check_startup(records: list, module: str = MODULE,
+                  budget_us: int = IMPORT_BUDGET_US) -> list:
+    """
+    Проверка отчёта импорта. Возвращает список нарушений.
+
+    budget_us - бюджет времени импорта module, None - без проверки времени
+    """
+    errors = []
+    loaded = {name.split('.')[0] for _, _, name in records}
+    heavy_modules = HEAVY_MODULES
+    if os.path.exists(join(ROOT_DIR, ENV_FILE)):
+        heavy_modules = tuple(
+            heavy for heavy in heavy_modules if heavy != 'dotenv'
+        )
+    for heavy in heavy_modules:
+        if heavy in loaded:
+            errors.append(f'при старте загружен тяжёлый модуль {heavy}')
+
+    total = next(
+        (cumulative for _, cumulative, name in records if name == module), 0
+    )
+    if budget_us is not None and total > budget_us:
+        errors.append(
+            f'импорт {module} занял {total} us, бюджет {budget_us} us'
+        )
+    return errors
+
+
+def report(records: list, top: int = REPORT_TOP) -> str:
+    """Отчёт о самых медленных импортах по cumulative времени."""
+    lines = [f'{"self us":>10} {"cumulative us":>14}  module']
+    for self_us, cumulative_us, name in sorted(
+        records, key=lambda record: record[1], reverse=True
+    )[:top]:
+        lines.append(f'{self_us:>10} {cumulative_us:>14}  {name}')
+    return '\n'.join(lines)
+
+
+def main() -> int:
+    """Печать отчёта и проверка бюджета старта."""
+    records = measure_imports()
+    print(report(records))
+    errors = check_startup(records)
+    for error in errors:
+        print(f'FAIL: {error}')
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,6 +2,9 @@
 Константы homework_bot.
 
 HOMEWORK_STATUSES - статусы работ
+HOMEWORK_KEYS - обязательные ключи работы
+HOMEWORK_MESSAGE_PREFIX, HOMEWORK_MESSAGE_SUFFIXES - заготовки сообщений
+о статусе: префикс + название работы + окончание с вердиктом
 LOG_MESSAGES - сообщения логирования
 """
 HOMEWORK_STATUSES = {
@@ -10,18 +13,32 @@ HOMEWORK_STATUSES = {
     'rejected': 'Работа проверена: у ревьюера есть замечания.',
 }
 
-HOMEWORK_KEYS = {'homework_name', 'status'}
+HOMEWORK_KEYS = frozenset({'homework_name', 'status'})
+
+HOMEWORK_MESSAGE_PREFIX = 'Изменился статус проверки работы "'
+HOMEWORK_MESSAGE_SUFFIXES = {
+    status: f'". {verdict}' for status, verdict in HOMEWORK_STATUSES.items()
+}
 
 LOG_MESSAGES = {
     'app_start': 'homework_bot started ...',
-    'app_stop': 'homework_bot stoped: ctrl+c',
+    'app_stop': 'homework_bot stoped',
+    'backfill_done': 'Загружена история статусов',
+    'backfill_failed': 'Не удалось загрузить историю статусов',
     'empty_list': 'Получен пустой список',
     'error_send_message': 'Ошибка отправки сообщения',
     'error_tranform_response_to_diсt':
         'Не удалось преобразовать ответ к словарю',
+    'shutdown': 'Получен сигнал остановки',
+    'snapshot_failed': 'Не удалось сохранить снимок состояния',
     'succesfully_send_message': 'Сообщение успешно отправлено',
+    'undelivered': 'Не отправлено до остановки, сохранено сообщений',
     'missed_env': 'Отсутствуют переменные окружения',
+    'malformed_homeworks': 'Некорректных работ в ответе API',
     'missed_key': 'В ответе отсуствует ключ',
+    'rate_limited': 'API Yandex практикума ограничил частоту запросов',
+    'rate_limiter': 'Ограничитель частоты запросов к API',
+    'response_cache': 'Кеш ответов API',
     'wrong_status': 'Статус работы отличается от ожидаемых',
     'wrong_status_code': 'API Yandex практикума вернул код <> OK',
     'wrong_type': 'API вернул ответ некорректного типа',
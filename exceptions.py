@@ -2,5 +2,13 @@ class API_Ya_Practicum_Exception_Endpoint(Exception):
     pass
 
 
-class Telegram_Exception(Exception):
-    pass
+class Notifier_Exception(Exception):
+    """Ошибка доставки уведомления через канал."""
+
+
+class Telegram_Exception(Notifier_Exception):
+    """Ошибка отправки сообщения в Telegram."""
+
+
+class Notifier_Cancelled_Exception(Notifier_Exception):
+    """Отправка прервана остановкой бота."""
@@ -0,0 +1,274 @@
+"""
+history.py.
+
+История изменений статусов домашних работ в локальной базе SQLite
+и аналитика времени проверки по ней.
+
+Запуск аналитики:
+    python history.py --from reviewing --to approved --days 7
+"""
+import argparse
+import sqlite3
+import threading
+import time
+
+from array import array
+from datetime import datetime, timezone
+
+HISTORY_PATH = 'homework_bot.history.sqlite3'
+FETCH_BATCH = 50_000
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+PERCENTILES = (50, 90, 99)
+
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS transitions (
+        id INTEGER PRIMARY KEY,
+        tenant TEXT NOT NULL,
+        homework_name TEXT NOT NULL,
+        status TEXT NOT NULL,
+        updated_at INTEGER NOT NULL,
+        recorded_at INTEGER NOT NULL,
+        UNIQUE (tenant, homework_name, updated_at, status)
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS transitions_updated_at
+    ON transitions (updated_at)
+    ''',
+)
+
+INSERT = '''
+    INSERT OR IGNORE INTO transitions
+    (tenant, homework_name, status, updated_at, recorded_at)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+TURNAROUND = '''
+    SELECT duration FROM (
+        SELECT
+            status,
+            updated_at,
+            LAG(status) OVER w AS previous_status,
+            updated_at - LAG(updated_at) OVER w AS duration
+        FROM transitions
+        {where}
+        WINDOW w AS (
+            PARTITION BY tenant, homework_name ORDER BY updated_at, status
+        )
+    )
+    WHERE updated_at >= ? AND previous_status = ? AND status IN ({statuses})
+'''
+
+# Только работы с переходами после since: окно LAG по-прежнему видит
+# всю историю работы, включая начало проверки до since
+TURNAROUND_SINCE = '''
+        WHERE EXISTS (
+            SELECT 1 FROM transitions AS later
+            WHERE later.tenant = transitions.tenant
+                AND later.homework_name = transitions.homework_name
+                AND later.updated_at >= ?
+        )
+'''
+
+
+def _numpy():
+    """Модуль numpy, если он установлен (импортируется при первом вызове)."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def parse_date(value, default: int = None) -> int:
+    """Дата date_updated из ответа API в unix-время."""
+    try:
+        return int(
+            datetime.strptime(value, DATE_FORMAT)
+            .replace(tzinfo=timezone.utc)
+            .timestamp()
+        )
+    except (TypeError, ValueError):
+        return int(time.time()) if default is None else default
+
+
+class HistoryStore:
+    """
+    Хранилище переходов статусов с пакетной вставкой.
+
+    Буфер и соединение защищены блокировкой: хранилище можно
+    использовать из нескольких потоков опроса
+    """
+
+    def __init__(self, path: str = HISTORY_PATH) -> None:
+        """Открытие (создание) базы истории."""
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        with self._connection:
+            for statement in SCHEMA:
+                self._connection.execute(statement)
+        self._pending = []
+        self._lock = threading.RLock()
+
+    def record(self, tenant: str, homework: dict) -> None:
+        """Добавление перехода в буфер до следующего flush()."""
+        now = int(time.time())
+        row = (
+            tenant,
+            homework['homework_name'],
+            homework['status'],
+            parse_date(homework.get('date_updated'), now),
+            now,
+        )
+        with self._lock:
+            self._pending.append(row)
+
+    def add_many(self, rows) -> None:
+        """
+        Пакетная вставка переходов одной транзакцией.
+
+        rows - итерируемое кортежей
+        (tenant, homework_name, status, updated_at, recorded_at)
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(INSERT, rows)
+
+    def flush(self) -> int:
+        """Запись накопленных переходов. Возвращает их количество."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if pending:
+                self.add_many(pending)
+        return len(pending)
+
+    def durations(self, from_status: str, to_statuses,
+                  since: int = 0, batch_size: int = FETCH_BATCH):
+        """
+        Длительности переходов from_status -> to_statuses в секундах.
+
+        Пары соседних переходов одной работы выбираются оконной функцией
+        SQLite по всей истории работы в порядке уникального индекса
+        (без сортировки), since ограничивает время перехода в to_statuses.
+        Результат читается пачками по batch_size строк
+        """
+        to_statuses = tuple(to_statuses)
+        query = TURNAROUND.format(
+            where=TURNAROUND_SINCE if since > 0 else '',
+            statuses=', '.join('?' * len(to_statuses)),
+        )
+        params = (since, from_status, *to_statuses)
+        if since > 0:
+            params = (since, *params)
+        np = _numpy()
+        batches = []
+        with self._lock:
+            cursor = self._connection.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if np is not None:
+                    batches.append(np.fromiter(
+                        (row[0] for row in rows), dtype=np.float64,
+                        count=len(rows),
+                    ))
+                else:
+                    batches.append(array('d', (row[0] for row in rows)))
+
+        if np is not None:
+            return np.concatenate(batches) if batches else np.empty(0)
+        values = array('d')
+        for batch in batches:
+            values.extend(batch)
+        return values
+
+    def close(self) -> None:
+        """Запись буфера и закрытие базы."""
+        with self._lock:
+            self.flush()
+            self._connection.close()
+
+
+def _percentile(sorted_values, percent: float) -> float:
+    """Перцентиль с линейной интерполяцией, как numpy.percentile."""
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return (sorted_values[lower] * (1 - fraction)
+            + sorted_values[upper] * fraction)
+
+
+def describe(durations) -> dict:
+    """Статистика распределения длительностей: count, mean, min, max, pN."""
+    count = len(durations)
+    if not count:
+        return {'count': 0}
+    np = _numpy()
+    if np is not None:
+        values = np.asarray(durations, dtype=np.float64)
+        result = {
+            'count': count,
+            'mean': float(values.mean()),
+            'min': float(values.min()),
+            'max': float(values.max()),
+        }
+        for percent, value in zip(
+            PERCENTILES, np.percentile(values, PERCENTILES)
+        ):
+            result[f'p{percent}'] = float(value)
+        return result
+
+    values = sorted(durations)
+    result = {
+        'count': count,
+        'mean': sum(values) / count,
+        'min': values[0],
+        'max': values[-1],
+    }
+    for percent in PERCENTILES:
+        result[f'p{percent}'] = _percentile(values, percent)
+    return result
+
+
+def turnaround(store: HistoryStore, from_status: str, to_statuses,
+               since: int = 0) -> dict:
+    """Распределение времени от статуса from_status до to_statuses."""
+    return describe(store.durations(from_status, to_statuses, since))
+
+
+def main(argv=None) -> None:
+    """Команда аналитики времени проверки."""
+    parser = argparse.ArgumentParser(
+        description='Аналитика времени проверки домашних работ'
+    )
+    parser.add_argument('--db', default=HISTORY_PATH)
+    parser.add_argument('--from', dest='from_status', default='reviewing')
+    parser.add_argument(
+        '--to', dest='to_statuses', nargs='+',
+        default=['approved', 'rejected'],
+    )
+    parser.add_argument(
+        '--days', type=float, default=7,
+        help='за сколько последних дней (0 - вся история)',
+    )
+    args = parser.parse_args(argv)
+
+    since = int(time.time() - args.days * 86400) if args.days else 0
+    store = HistoryStore(args.db)
+    try:
+        stats = turnaround(store, args.from_status, args.to_statuses, since)
+    finally:
+        store.close()
+
+    print(f'{args.from_status} -> {"|".join(args.to_statuses)}: '
+          f'{stats["count"]} переходов')
+    for key, value in stats.items():
+        if key != 'count':
+            print(f'{key:>6}: {value / 3600:.2f} ч')
+
+
+if __name__ == '__main__':
+    main()
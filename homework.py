@@ -4,36 +4,106 @@ homework.py.
 Бот для отправки сообщений в телеграм изменения статуса домашних работ
 Яндекс практикум
 """
+import functools
+import json
 import logging
 import os
+import signal
+import threading
 import time
 
 from http import HTTPStatus
 from sys import stdout
+from typing import TYPE_CHECKING
 
-import requests
-import telegram
-
-from dotenv import load_dotenv
-
+import backfill
 import constants as const
 import exceptions as exp
+import history
+import notifiers
+import ratelimit
+import response_cache
+import state
+import tracing
+
+if TYPE_CHECKING:
+    import telegram
+
+ENV_VARS = ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID')
+
 
-load_dotenv()
+ENV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+
+
+def load_env() -> None:
+    """
+    Загрузка переменных окружения из env-файла.
+
+    dotenv импортируется, только если рядом с модулем есть env-файл
+    или в окружении процесса не хватает обязательных переменных.
+    Заданные в окружении переменные не перезаписываются, необязательные
+    (WEBHOOK_URL, SMTP_*, TRACE_*) дочитываются из env-файла
+    """
+    env_file = os.path.exists(ENV_PATH)
+    if not env_file and all(var in os.environ for var in ENV_VARS):
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv(ENV_PATH if env_file else None)
+
+
+load_env()
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+SMTP_HOST = os.getenv('SMTP_HOST')
+SMTP_PORT = int(os.getenv('SMTP_PORT', 25))
+SMTP_FROM = os.getenv('SMTP_FROM', 'homework_bot@localhost')
+SMTP_TO = os.getenv('SMTP_TO')
+SMTP_USER = os.getenv('SMTP_USER')
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
+SMTP_STARTTLS = bool(os.getenv('SMTP_STARTTLS'))
+
 RETRY_TIME = 600
+SNAPSHOT_PATH = os.getenv('STATE_SNAPSHOT', 'homework_bot.state')
+SNAPSHOT_INTERVAL = 60
+DRAIN_TIMEOUT = 20
+TRACE_FILE = os.getenv('TRACE_FILE')
+TRACE_COLLECTOR_URL = os.getenv('TRACE_COLLECTOR_URL')
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.1))
+API_TIMEOUT = 15
+HISTORY_PATH = os.getenv('HISTORY_DB', history.HISTORY_PATH)
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
+API_RATE = 1.0
+API_MAX_RATE = 5.0
+
+ACCEPT_ENCODING = 'gzip, deflate'
+
+FAILURE_SAMPLE = 3
+FAILURE_DETAIL_LENGTH = 200
+
+rate_limiter = ratelimit.RateLimiter(rate=API_RATE, max_rate=API_MAX_RATE)
+api_cache = response_cache.ResponseCache()
+shutdown_event = threading.Event()
 
-def send_message(bot: telegram.Bot, message: str) -> None:
+
+def send_message(bot: 'telegram.Bot', message: str) -> None:
     """Отправка сообщений в телеграмм."""
+    send_telegram_message(bot, message)
+
+
+def send_telegram_message(bot: 'telegram.Bot', message: str,
+                          timeout: float = None) -> None:
+    """Отправка сообщения в телеграмм с таймаутом запроса в секундах."""
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        bot.send_message(TELEGRAM_CHAT_ID, message, timeout=timeout)
         logging.info(
             f'{const.LOG_MESSAGES["succesfully_send_message"]}: {message}'
         )
@@ -43,24 +113,50 @@ def send_message(bot: telegram.Bot, message: str) -> None:
         )
 
 
-def get_api_answer(current_timestamp=int(time.time())) -> dict:
+def request_api_answer(current_timestamp: int, headers: dict,
+                       tenant: str = ratelimit.DEFAULT_TENANT):
     """
-    Выполняет запрос к API на получение новых статусом ДР.
+    Выполняет запрос к API через глобальный ограничитель частоты.
 
-    Полученный json-массив преобразуется в словарь
-    На входе временная метка
+    Возвращает ответ requests с кодом OK, ответ подстраивает
+    скорость ограничителя (429, Retry-After). Ожидание токена
+    прерывается остановкой бота
     """
+    import requests
+
+    if not rate_limiter.acquire(tenant, cancel=shutdown_event):
+        raise exp.API_Ya_Practicum_Exception_Endpoint(
+            const.LOG_MESSAGES['shutdown']
+        )
     params = {'from_date': current_timestamp}
     homework_statuses = requests.get(
         ENDPOINT,
-        headers=HEADERS,
-        params=params
+        headers={**headers, 'Accept-Encoding': ACCEPT_ENCODING},
+        params=params,
+        timeout=API_TIMEOUT,
     )
     answer_code = homework_statuses.status_code
+    rate_limiter.feedback(
+        answer_code, homework_statuses.headers.get('Retry-After')
+    )
+    if answer_code == HTTPStatus.TOO_MANY_REQUESTS:
+        message = f'{const.LOG_MESSAGES["rate_limited"]}: {answer_code}'
+        raise exp.API_Ya_Practicum_Exception_Endpoint(message)
     if answer_code != HTTPStatus.OK:
         message = f'{const.LOG_MESSAGES["wrong_status_code"]}: {answer_code}'
-        raise exp.API_Ya_Practicum_Exception(message)
+        raise exp.API_Ya_Practicum_Exception_Endpoint(message)
+
+    return homework_statuses
+
+
+def get_api_answer(current_timestamp=int(time.time())) -> dict:
+    """
+    Выполняет запрос к API на получение новых статусом ДР.
 
+    Полученный json-массив преобразуется в словарь
+    На входе временная метка
+    """
+    homework_statuses = request_api_answer(current_timestamp, HEADERS)
     try:
         return dict(homework_statuses.json())
     except Exception:
@@ -69,6 +165,46 @@ def get_api_answer(current_timestamp=int(time.time())) -> dict:
         )
 
 
+def poll_api_answer(current_timestamp: int, headers: dict,
+                    tenant: str) -> tuple:
+    """
+    Запрос к API с пропуском неизменившихся ответов.
+
+    Возвращает (словарь ответа, отпечаток тела); словарь None,
+    если тело совпадает с последним обработанным для арендатора
+    """
+    with tracing.tracer.span('get_api_answer') as span:
+        homework_statuses = request_api_answer(
+            current_timestamp, headers, tenant
+        )
+        body = homework_statuses.content
+        wire_bytes = int(
+            homework_statuses.headers.get('Content-Length', len(body))
+        )
+        span.set_attribute('http.status', homework_statuses.status_code)
+        span.set_attribute('http.wire_bytes', wire_bytes)
+        elapsed = getattr(homework_statuses, 'elapsed', None)
+        if elapsed is not None:
+            span.set_attribute(
+                'http.first_byte_ms', elapsed.total_seconds() * 1000
+            )
+    api_cache.record_transfer(wire_bytes, len(body))
+    with tracing.tracer.span('fingerprint') as span:
+        body_fingerprint = response_cache.fingerprint(body)
+        unchanged = api_cache.unchanged(tenant, body_fingerprint)
+        span.set_attribute('cache_hit', unchanged)
+    if unchanged:
+        return None, body_fingerprint
+
+    with tracing.tracer.span('decode', bytes=len(body)):
+        try:
+            return dict(json.loads(body)), body_fingerprint
+        except Exception:
+            raise ValueError(
+                const.LOG_MESSAGES['error_tranform_response_to_diсt']
+            )
+
+
 def check_response(response: dict) -> list:
     """
     Выполняет проверку ответа API на соотвествие.
@@ -99,24 +235,63 @@ def parse_status(homework: list) -> str:
     Извлекает информацию по ключам homework_name и status из списка
     Возвращает строку с информацией о новом статусе
     """
-    for key in const.HOMEWORK_KEYS:
-        if key not in homework:
-            message = (
-                f'{const.LOG_MESSAGES["missed_key"]} {key}: {homework}'
-            )
-            raise KeyError(message)
+    if not const.HOMEWORK_KEYS <= homework.keys():
+        missed_keys = ', '.join(sorted(const.HOMEWORK_KEYS - homework.keys()))
+        message = (
+            f'{const.LOG_MESSAGES["missed_key"]} {missed_keys}: {homework}'
+        )
+        raise KeyError(message)
 
-    if homework['status'] not in const.HOMEWORK_STATUSES.keys():
+    suffix = const.HOMEWORK_MESSAGE_SUFFIXES.get(homework['status'])
+    if suffix is None:
         message = (
             f'{const.LOG_MESSAGES["wrong_status"]}: {homework["status"]}'
         )
         raise ValueError(message)
 
-    homework_name = homework['homework_name']
-    homework_status = homework['status']
-    verdict = const.HOMEWORK_STATUSES[homework_status]
+    return (
+        const.HOMEWORK_MESSAGE_PREFIX + str(homework['homework_name']) + suffix
+    )
 
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+
+def parse_statuses(homeworks: list) -> tuple:
+    """
+    Пакетная проверка и получение сообщений для списка работ.
+
+    Ошибки собираются по каждой работе, а не прерывают обработку списка
+    Возвращает (список пар (работа, сообщение),
+    список пар (работа, исключение))
+    """
+    keys = const.HOMEWORK_KEYS
+    prefix = const.HOMEWORK_MESSAGE_PREFIX
+    suffixes = const.HOMEWORK_MESSAGE_SUFFIXES
+    parsed = []
+    errors = []
+    for homework in homeworks:
+        try:
+            if keys <= homework.keys():
+                suffix = suffixes.get(homework['status'])
+                if suffix is not None:
+                    parsed.append((
+                        homework,
+                        prefix + str(homework['homework_name']) + suffix,
+                    ))
+                    continue
+        except (AttributeError, TypeError):
+            pass
+        try:
+            parse_status(homework)
+        except (KeyError, ValueError, TypeError, AttributeError) as error:
+            errors.append((homework, error))
+    return parsed, errors
+
+
+def parse_tenants_statuses(tenants_homeworks: dict) -> dict:
+    """Пакетная обработка списков работ нескольких арендаторов."""
+    return {
+        tenant: parse_statuses(homeworks)
+        for tenant, homeworks in tenants_homeworks.items()
+    }
 
 
 def check_tokens() -> bool:
@@ -135,54 +310,294 @@ def check_tokens() -> bool:
     return result
 
 
-def main():
-    """Основная логика работы бота."""
-    if not check_tokens():
-        message = const.LOG_MESSAGES['missed_env']
-        raise EnvironmentError(message)
+def build_notifiers(bot: 'telegram.Bot') -> list:
+    """Каналы доставки сообщений по переменным окружения."""
+    channels = [
+        notifiers.TelegramNotifier(
+            functools.partial(send_telegram_message, bot)
+        )
+    ]
+    if WEBHOOK_URL:
+        channels.append(notifiers.WebhookNotifier(WEBHOOK_URL))
+    if SMTP_HOST and SMTP_TO:
+        channels.append(notifiers.SmtpNotifier(
+            SMTP_HOST,
+            SMTP_PORT,
+            SMTP_FROM,
+            SMTP_TO.split(','),
+            username=SMTP_USER,
+            password=SMTP_PASSWORD,
+            starttls=SMTP_STARTTLS,
+        ))
+    return channels
+
+
+def send_new_statuses(dispatcher: notifiers.Dispatcher,
+                      tenant_state: state.TenantState,
+                      homeworks: list) -> tuple:
+    """
+    Отправка сообщений об изменении статусов домашних работ.
 
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
+    Статусы, уже известные из состояния арендатора, повторно не отправляются
+    Возвращает (список работ, статус которых изменился,
+    список пар (некорректная работа, исключение))
+    """
+    with tracing.tracer.span('parse_status', homeworks=len(homeworks)):
+        parsed, errors = parse_statuses(homeworks)
+    changed = []
+    for homework, message in parsed:
+        homework_name = homework['homework_name']
+        if tenant_state.statuses.get(homework_name) == homework['status']:
+            continue
+        dispatcher.dispatch(message)
+        tenant_state.statuses[homework_name] = homework['status']
+        changed.append(homework)
+    return changed, errors
+
+
+def report_failure(dispatcher: notifiers.Dispatcher,
+                   tenant_state: state.TenantState, error) -> None:
+    """Логирование сбоя и отправка сообщения, если оно не повторяется."""
+    message = f'Сбой в работе программы: {error}'
+    logging.error(message)
+    if tenant_state.last_message != message:
+        dispatcher.dispatch(message)
+        tenant_state.last_message = message
+
+
+def describe_errors(errors: list) -> str:
+    """
+    Краткое описание некорректных работ для сообщения о сбое.
 
-    message = const.LOG_MESSAGES['app_start']
-    logging.info(message)
-    send_message(bot, message)
+    Число работ и первые FAILURE_SAMPLE ошибок, каждая не длиннее
+    FAILURE_DETAIL_LENGTH символов: сообщение укладывается
+    в ограничение длины сообщения Telegram
+    """
+    sample = []
+    for _, error in errors[:FAILURE_SAMPLE]:
+        detail = str(error.args[0]) if error.args else repr(error)
+        if len(detail) > FAILURE_DETAIL_LENGTH:
+            detail = detail[:FAILURE_DETAIL_LENGTH - 3] + '...'
+        sample.append(detail)
+    if len(errors) > FAILURE_SAMPLE:
+        sample.append('...')
+    return (
+        f'{const.LOG_MESSAGES["malformed_homeworks"]}: {len(errors)}; '
+        + '; '.join(sample)
+    )
 
-    last_message = ''
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            for homework in check_response(response):
-                message = parse_status(homework)
-                send_message(bot, message)
-            current_timestamp = int(time.time())
-            time.sleep(RETRY_TIME)
 
-        except EnvironmentError as error:
-            logging.info(error)
-            return
+def process_answer(dispatcher: notifiers.Dispatcher, tenant: str,
+                   tenant_state: state.TenantState, response: dict,
+                   history_store: history.HistoryStore) -> None:
+    """
+    Обработка ответа API: рассылка новых статусов и запись истории.
 
-        except KeyboardInterrupt:
-            message = const.LOG_MESSAGES['app_stop']
-            logging.info(message)
-            send_message(bot, message)
-            return
+    Некорректные работы не прерывают обработку остальных,
+    о них отправляется одно сообщение о сбое
+    """
+    with tracing.tracer.span('check_response'):
+        homeworks = check_response(response)
+    changed, errors = send_new_statuses(dispatcher, tenant_state, homeworks)
+    for homework in changed:
+        history_store.record(tenant, homework)
+    history_store.flush()
+    if errors:
+        report_failure(dispatcher, tenant_state, describe_errors(errors))
+
+
+def configure_tracing() -> None:
+    """Включение трассировки по переменным окружения."""
+    if TRACE_COLLECTOR_URL:
+        exporter = tracing.CollectorExporter(TRACE_COLLECTOR_URL)
+    elif TRACE_FILE:
+        exporter = tracing.JsonLinesExporter(TRACE_FILE)
+    else:
+        return
+    tracing.tracer.configure(exporter, TRACE_SAMPLE_RATE)
+
+
+def handle_shutdown(signum, frame) -> None:
+    """Обработчик SIGTERM и SIGINT: новые опросы больше не планируются."""
+    logging.info(
+        f'{const.LOG_MESSAGES["shutdown"]}: {signal.Signals(signum).name}'
+    )
+    shutdown_event.set()
+    rate_limiter.interrupt()
+
+
+def install_signal_handlers() -> None:
+    """Установка обработчиков сигналов остановки."""
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, handle_shutdown)
+
+
+def poll_once(dispatcher: notifiers.Dispatcher, tenant: str,
+              tenant_state: state.TenantState, headers: dict,
+              history_store: history.HistoryStore) -> None:
+    """
+    Одна итерация опроса арендатора.
+
+    Запрос к API, рассылка новых статусов и сдвиг временной метки
+    """
+    with tracing.tracer.span('poll', tenant=tenant):
+        response, body_fingerprint = poll_api_answer(
+            tenant_state.timestamp, headers, tenant
+        )
+        if response is not None:
+            process_answer(dispatcher, tenant, tenant_state,
+                           response, history_store)
+            api_cache.remember(tenant, body_fingerprint)
+    tenant_state.timestamp = int(time.time())
 
-        except exp.Telegram_Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            logging.error(message)
-            time.sleep(RETRY_TIME)
+
+def poll(dispatcher: notifiers.Dispatcher, bot_state: state.BotState,
+         tenant: str, history_store: history.HistoryStore) -> None:
+    """
+    Цикл опроса API и отправки сообщений до остановки бота.
+
+    Ошибки опроса, включая сетевые (таймауты, обрывы соединения),
+    отправляются в report_failure, опрос продолжается по расписанию
+    """
+    tenant_state = bot_state.get(tenant)
+    while not shutdown_event.is_set():
+        try:
+            if shutdown_event.wait(max(0, tenant_state.due - time.time())):
+                break
+            poll_once(
+                dispatcher, tenant, tenant_state, HEADERS, history_store
+            )
+
+        except KeyboardInterrupt:
+            shutdown_event.set()
+            break
 
         except (exp.API_Ya_Practicum_Exception_Endpoint,
                 ValueError,
                 TypeError,
                 Exception) as error:
-            message = f'Сбой в работе программы: {error}'
-            logging.error(message)
-            if last_message != message:
-                send_message(bot, message)
-                last_message = message
-            time.sleep(RETRY_TIME)
+            if shutdown_event.is_set():
+                break
+            report_failure(dispatcher, tenant_state, error)
+
+        logging.debug(
+            f'{const.LOG_MESSAGES["rate_limiter"]}: {rate_limiter.metrics()}'
+        )
+        logging.debug(
+            f'{const.LOG_MESSAGES["response_cache"]}: {api_cache.metrics()}'
+        )
+        tenant_state.due = time.time() + RETRY_TIME
+        save_snapshot(bot_state, SNAPSHOT_INTERVAL)
+
+
+def save_snapshot(bot_state: state.BotState, interval: float = 0) -> None:
+    """
+    Запись снимка состояния, если с прошлой записи прошло interval секунд.
+
+    Ошибка записи (например, нет места на диске) логируется и не
+    останавливает бота: снимок будет записан при следующей попытке
+    """
+    try:
+        bot_state.save_if_due(SNAPSHOT_PATH, interval)
+    except OSError as error:
+        logging.error(f'{const.LOG_MESSAGES["snapshot_failed"]}: {error}')
+
+
+def backfill_new_tenant(dispatcher: notifiers.Dispatcher,
+                        bot_state: state.BotState, tenant: str,
+                        history_store: history.HistoryStore,
+                        last_failure: str = None):
+    """
+    Первичная загрузка истории, если арендатор ещё не известен состоянию.
+
+    При ошибке арендатор не добавляется в состояние, чтобы загрузка
+    повторилась; сообщение об ошибке не отправляется повторно, если
+    совпадает с last_failure. Возвращает None, если арендатор известен
+    состоянию, иначе сообщение об ошибке
+    """
+    if tenant in bot_state:
+        return None
+    summaries = backfill.backfill(
+        {tenant: get_api_answer}, bot_state, history_store
+    )
+    message = backfill.summary_message(summaries[tenant])
+    failed = 'error' in summaries[tenant]
+    if not failed or message != last_failure:
+        dispatcher.dispatch(message)
+    return message if failed else None
+
+
+def resend_outbox(dispatcher: notifiers.Dispatcher,
+                  tenant_state: state.TenantState) -> None:
+    """Повторная отправка сообщений, не доставленных до прошлой остановки."""
+    outbox, tenant_state.outbox = tenant_state.outbox, []
+    for channel, message in outbox:
+        dispatcher.dispatch(message, channels={channel})
+
+
+def shutdown(dispatcher: notifiers.Dispatcher, bot_state: state.BotState,
+             tenant: str, history_store: history.HistoryStore) -> None:
+    """
+    Остановка бота без потери работы.
+
+    Сообщения отправляются в течение DRAIN_TIMEOUT секунд, остальные
+    сохраняются в состояние арендатора вместе с курсорами и историей
+    (если история арендатора уже загружена). Сообщение об остановке
+    не сохраняется: после перезапуска оно уже неактуально
+    """
+    message = const.LOG_MESSAGES['app_stop']
+    logging.info(message)
+    dispatcher.dispatch(message)
+    undelivered = [
+        (channel, text) for channel, text in dispatcher.close(DRAIN_TIMEOUT)
+        if text != message
+    ]
+    if tenant in bot_state:
+        bot_state.get(tenant).outbox.extend(undelivered)
+    tracing.tracer.close()
+    history_store.close()
+    save_snapshot(bot_state)
+    bot_state.close()
+
+
+def main():
+    """Основная логика работы бота."""
+    if not check_tokens():
+        message = const.LOG_MESSAGES['missed_env']
+        raise EnvironmentError(message)
+
+    install_signal_handlers()
+    configure_tracing()
+
+    import telegram
+
+    bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    dispatcher = notifiers.Dispatcher(build_notifiers(bot))
+    tenant = str(TELEGRAM_CHAT_ID)
+    bot_state = state.BotState.load(SNAPSHOT_PATH)
+    history_store = history.HistoryStore(HISTORY_PATH)
+
+    message = const.LOG_MESSAGES['app_start']
+    logging.info(message)
+    dispatcher.dispatch(message)
+
+    try:
+        failure = None
+        while True:
+            failure = backfill_new_tenant(
+                dispatcher, bot_state, tenant, history_store, failure
+            )
+            if failure is None:
+                break
+            if shutdown_event.wait(RETRY_TIME):
+                return
+        tenant_state = bot_state.get(tenant)
+        resend_outbox(dispatcher, tenant_state)
+        if not tenant_state.timestamp:
+            tenant_state.timestamp = int(time.time())
+        poll(dispatcher, bot_state, tenant, history_store)
+    finally:
+        shutdown(dispatcher, bot_state, tenant, history_store)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,294 @@
+"""
+notifiers.py.
+
+Каналы доставки сообщений бота: Telegram, webhook и почта (SMTP).
+Dispatcher рассылает каждое сообщение во все каналы параллельно:
+у каждого канала свой поток, таймауты, повторы и постоянное соединение,
+поэтому медленный канал не задерживает остальные и цикл опроса.
+"""
+import logging
+import threading
+import time
+
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Optional
+
+import constants as const
+import exceptions as exp
+import tracing
+
+NOTIFY_TIMEOUT = 10
+NOTIFY_RETRIES = 2
+NOTIFY_BACKOFF = 1.0
+EMAIL_SUBJECT = 'homework_bot'
+
+
+class Notifier:
+    """
+    Базовый канал доставки.
+
+    Наследники реализуют deliver(), повторы с экспоненциальной
+    задержкой выполняет send()
+    """
+
+    name = 'notifier'
+
+    def __init__(self, timeout: float = NOTIFY_TIMEOUT,
+                 retries: int = NOTIFY_RETRIES,
+                 backoff: float = NOTIFY_BACKOFF) -> None:
+        """Настройка таймаута и повторов канала."""
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._cancelled = threading.Event()
+
+    def deliver(self, message: str) -> None:
+        """Однократная доставка сообщения."""
+        raise NotImplementedError
+
+    def send(self, message: str) -> None:
+        """
+        Доставка сообщения с повторами. Исключение Notifier_Exception.
+
+        После cancel() новые попытки не начинаются:
+        исключение Notifier_Cancelled_Exception
+        """
+        for attempt in range(self.retries + 1):
+            if self._cancelled.is_set():
+                raise exp.Notifier_Cancelled_Exception(
+                    f'{const.LOG_MESSAGES["error_send_message"]} '
+                    f'{self.name}: отправка отменена'
+                )
+            try:
+                self.deliver(message)
+                return
+            except Exception as error:
+                last_error = error
+                logging.warning(
+                    f'{const.LOG_MESSAGES["error_send_message"]} '
+                    f'{self.name} ({attempt + 1}/{self.retries + 1}): {error}'
+                )
+                if attempt < self.retries:
+                    self._cancelled.wait(self.backoff * 2 ** attempt)
+        raise exp.Notifier_Exception(
+            f'{const.LOG_MESSAGES["error_send_message"]} '
+            f'{self.name}: {last_error}'
+        )
+
+    def cancel(self) -> None:
+        """Отмена повторов: текущая попытка доставки завершается."""
+        self._cancelled.set()
+
+    def close(self) -> None:
+        """Освобождение соединений канала."""
+
+
+class TelegramNotifier(Notifier):
+    """Доставка в Telegram функцией send(message, timeout)."""
+
+    name = 'telegram'
+
+    def __init__(self, send, **kwargs) -> None:
+        """
+        Функция send синхронно отправляет одно сообщение в Telegram.
+
+        timeout канала передаётся ей в каждом вызове
+        """
+        super().__init__(**kwargs)
+        self._send = send
+
+    def deliver(self, message: str) -> None:
+        """Отправка сообщения в Telegram."""
+        self._send(message, timeout=self.timeout)
+
+
+class WebhookNotifier(Notifier):
+    """POST сообщения в формате {"text": ...} на URL."""
+
+    name = 'webhook'
+
+    def __init__(self, url: str, pool_size: int = 1, **kwargs) -> None:
+        """Создание сессии с пулом соединений к url."""
+        super().__init__(**kwargs)
+        import requests
+
+        self.url = url
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size
+        )
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def deliver(self, message: str) -> None:
+        """Отправка сообщения на webhook."""
+        response = self._session.post(
+            self.url, json={'text': message}, timeout=self.timeout
+        )
+        response.raise_for_status()
+
+    def close(self) -> None:
+        """Закрытие сессии."""
+        self._session.close()
+
+
+class SmtpNotifier(Notifier):
+    """Отправка сообщения письмом через постоянное SMTP-соединение."""
+
+    name = 'smtp'
+
+    def __init__(self, host: str, port: int, sender: str, recipients: list,
+                 username: str = None, password: str = None,
+                 starttls: bool = False, **kwargs) -> None:
+        """Настройка SMTP-сервера и адресов."""
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self._smtp = None
+
+    def _connect(self):
+        if self._smtp is None:
+            import smtplib
+
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            self._smtp = smtp
+        return self._smtp
+
+    def deliver(self, message: str) -> None:
+        """Отправка письма. При ошибке соединение открывается заново."""
+        from email.message import EmailMessage
+
+        email = EmailMessage()
+        email['Subject'] = EMAIL_SUBJECT
+        email['From'] = self.sender
+        email['To'] = ', '.join(self.recipients)
+        email.set_content(message)
+        try:
+            self._connect().send_message(email)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Закрытие SMTP-соединения."""
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        self._smtp = None
+
+
+class Dispatcher:
+    """Параллельная рассылка сообщений во все каналы."""
+
+    def __init__(self, notifiers: list) -> None:
+        """Запуск отдельного потока для каждого канала."""
+        self.notifiers = list(notifiers)
+        self._executors = [
+            ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f'notify-{notifier.name}'
+            )
+            for notifier in self.notifiers
+        ]
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _send(self, notifier: Notifier, message: str,
+              parent, queued: float) -> Optional[bool]:
+        """
+        Отправка сообщения в один канал.
+
+        Возвращает True при доставке, False при ошибке канала и None,
+        если отправка прервана остановкой бота
+        """
+        with tracing.tracer.span(
+            'send_message', parent=parent, channel=notifier.name
+        ) as span:
+            span.set_attribute(
+                'queued_ms', (time.perf_counter() - queued) * 1000
+            )
+            try:
+                notifier.send(message)
+            except exp.Notifier_Cancelled_Exception as error:
+                logging.warning(error)
+                span.set_attribute('error', str(error))
+                return None
+            except exp.Notifier_Exception as error:
+                logging.error(error)
+                span.set_attribute('error', str(error))
+                return False
+        logging.debug(
+            f'{const.LOG_MESSAGES["succesfully_send_message"]} '
+            f'{notifier.name}: {message}'
+        )
+        return True
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self._pending.pop(future, None)
+
+    def dispatch(self, message: str, channels=None) -> list:
+        """
+        Постановка сообщения в очередь каждого канала без ожидания.
+
+        channels - имена каналов (по умолчанию все)
+        Возвращает futures с результатом доставки по каналам: True,
+        False после неудачных повторов, None если отменено при остановке
+        """
+        futures = []
+        parent = tracing.tracer.current() or tracing.NOOP_SPAN
+        queued = time.perf_counter()
+        for notifier, executor in zip(self.notifiers, self._executors):
+            if channels is not None and notifier.name not in channels:
+                continue
+            future = executor.submit(
+                self._send, notifier, message, parent, queued
+            )
+            with self._lock:
+                if not future.done():
+                    self._pending[future] = (notifier.name, message)
+            future.add_done_callback(self._done)
+            futures.append(future)
+        return futures
+
+    def close(self, timeout: float = None) -> list:
+        """
+        Ожидание отправки поставленных сообщений и закрытие каналов.
+
+        Сообщения, не отправленные за timeout секунд, снимаются с очереди;
+        у отправляемых в этот момент отменяются повторы, а текущая попытка
+        (ограниченная таймаутом канала) дожидается завершения
+        Возвращает не отправленные сообщения [(канал, текст)]
+        для повторной отправки
+        """
+        with self._lock:
+            pending = dict(self._pending)
+        wait(pending, timeout)
+        running = [future for future in pending if not future.cancel()]
+        for notifier in self.notifiers:
+            notifier.cancel()
+        wait(running)
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        undelivered = [
+            entry for future, entry in pending.items()
+            if future.cancelled() or future.result() is None
+        ]
+        if undelivered:
+            logging.warning(
+                f'{const.LOG_MESSAGES["undelivered"]}: {len(undelivered)}'
+            )
+        for notifier in self.notifiers:
+            notifier.close()
+        return undelivered
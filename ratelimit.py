@@ -0,0 +1,182 @@
+"""
+ratelimit.py.
+
+Глобальный ограничитель частоты запросов к API Яндекс практикума.
+Token bucket, скорость которого подстраивается по принципу AIMD:
+после успешного ответа растёт на постоянную величину, после 429
+уменьшается в несколько раз; заголовок Retry-After блокирует запросы
+до указанного времени. Токены выдаются арендаторам по очереди.
+"""
+import math
+import threading
+import time
+
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+
+DEFAULT_TENANT = 'default'
+MAX_RETRY_AFTER = 600.0
+
+RETRY_AFTER_STATUSES = {
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+}
+
+
+def parse_retry_after(value, now: float = None) -> float:
+    """
+    Разбор заголовка Retry-After.
+
+    Возвращает задержку в секундах (число секунд или HTTP-дата), не больше
+    MAX_RETRY_AFTER; 0 если заголовок отсутствует или некорректен
+    """
+    if not value:
+        return 0.0
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError):
+            return 0.0
+        delay = retry_at - (time.time() if now is None else now)
+    if not math.isfinite(delay):
+        return 0.0
+    return min(MAX_RETRY_AFTER, max(0.0, delay))
+
+
+class RateLimiter:
+    """
+    Token bucket с AIMD-адаптацией скорости и честной очередью арендаторов.
+
+    rate - текущая скорость, запросов в секунду
+    burst - ёмкость корзины токенов
+    """
+
+    def __init__(self, rate: float = 1.0, max_rate: float = 5.0,
+                 min_rate: float = 0.05, burst: float = 5.0,
+                 increase: float = 0.1, decrease: float = 0.5,
+                 clock=time.monotonic) -> None:
+        """Создание ограничителя с начальной скоростью rate."""
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._tokens = burst
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._waiting = OrderedDict()
+        self.requests = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.rate_limited = 0
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def _delay(self, now: float) -> float:
+        delay = self._blocked_until - now
+        if self._tokens < 1:
+            delay = max(delay, (1 - self._tokens) / self.rate)
+        return delay
+
+    def _leave(self, tenant: str, served: bool) -> None:
+        waiters = self._waiting[tenant] - 1
+        if waiters:
+            self._waiting[tenant] = waiters
+            if served:
+                self._waiting.move_to_end(tenant)
+        else:
+            del self._waiting[tenant]
+
+    def acquire(self, tenant: str = DEFAULT_TENANT,
+                timeout: float = None, cancel=None) -> bool:
+        """
+        Получение токена на один запрос.
+
+        Блокирует поток, пока не появится токен и не подойдёт очередь
+        арендатора. Возвращает False, если истёк timeout или установлено
+        событие cancel (ожидание прерывается вызовом interrupt())
+        """
+        with self._cond:
+            started = self._clock()
+            self._waiting[tenant] = self._waiting.get(tenant, 0) + 1
+            served = False
+            waited = False
+            try:
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        return False
+                    now = self._clock()
+                    self._refill(now)
+                    delay = self._delay(now)
+                    if delay <= 0 and next(iter(self._waiting)) == tenant:
+                        self._tokens -= 1
+                        served = True
+                        break
+                    if timeout is not None:
+                        remaining = started + timeout - now
+                        if remaining <= 0:
+                            return False
+                        if delay <= 0 or delay > remaining:
+                            delay = remaining
+                    waited = True
+                    self._cond.wait(delay if delay > 0 else None)
+            finally:
+                self._leave(tenant, served)
+                self._cond.notify_all()
+
+            self.requests += 1
+            if waited:
+                self.throttled += 1
+                self.throttled_seconds += self._clock() - started
+            return True
+
+    def interrupt(self) -> None:
+        """Пробуждение ожидающих потоков для проверки событий cancel."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def feedback(self, status_code: int, retry_after=None) -> None:
+        """
+        Подстройка скорости по ответу API.
+
+        429 уменьшает скорость в 1/decrease раз, успешный ответ
+        увеличивает её на increase. Retry-After блокирует выдачу токенов
+        """
+        with self._cond:
+            now = self._clock()
+            self._refill(now)
+            if status_code == HTTPStatus.TOO_MANY_REQUESTS:
+                self.rate_limited += 1
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._tokens = min(self._tokens, 0.0)
+            elif status_code == HTTPStatus.OK:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+            if status_code in RETRY_AFTER_STATUSES:
+                delay = parse_retry_after(retry_after)
+                self._blocked_until = max(self._blocked_until, now + delay)
+            self._cond.notify_all()
+
+    def metrics(self) -> dict:
+        """Текущая скорость и счётчики ограничителя."""
+        with self._cond:
+            now = self._clock()
+            self._refill(now)
+            return {
+                'rate': self.rate,
+                'tokens': self._tokens,
+                'blocked_for': max(0.0, self._blocked_until - now),
+                'waiting_tenants': len(self._waiting),
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'throttled_seconds': self.throttled_seconds,
+                'rate_limited': self.rate_limited,
+            }
@@ -0,0 +1,81 @@
+"""
+response_cache.py.
+
+Кеш отпечатков тел ответов API по арендаторам.
+Большинство опросов возвращают то же тело, что и прошлый раз: если
+отпечаток не изменился, декодирование JSON, проверка ответа и поиск
+изменений статусов пропускаются.
+Поле current_date меняется в каждом ответе, поэтому его значение
+исключается из отпечатка поиском по сырым байтам, без разбора JSON
+(API отдаёт current_date в конце тела, поэтому поиск идёт с конца).
+"""
+import hashlib
+import re
+import threading
+
+CURRENT_DATE_KEY = b'"current_date"'
+CURRENT_DATE = re.compile(re.escape(CURRENT_DATE_KEY) + rb'\s*:\s*(\d+)')
+DIGEST_SIZE = 16
+
+
+def fingerprint(body: bytes) -> bytes:
+    """Отпечаток тела ответа без поля current_date."""
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    start = body.rfind(CURRENT_DATE_KEY)
+    match = CURRENT_DATE.match(body, start) if start != -1 else None
+    if match is None:
+        digest.update(body)
+    else:
+        view = memoryview(body)
+        digest.update(view[:match.start(1)])
+        digest.update(view[match.end(1):])
+    return digest.digest()
+
+
+class ResponseCache:
+    """Последние обработанные отпечатки ответов и статистика трафика."""
+
+    def __init__(self) -> None:
+        """Создание пустого кеша."""
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.wire_bytes = 0
+        self.body_bytes = 0
+
+    def unchanged(self, tenant: str, body_fingerprint: bytes) -> bool:
+        """Совпадает ли отпечаток с последним обработанным для арендатора."""
+        with self._lock:
+            if self._fingerprints.get(tenant) == body_fingerprint:
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def remember(self, tenant: str, body_fingerprint: bytes) -> None:
+        """Запоминание отпечатка после успешной обработки ответа."""
+        with self._lock:
+            self._fingerprints[tenant] = body_fingerprint
+
+    def forget(self, tenant: str) -> None:
+        """Сброс отпечатка арендатора."""
+        with self._lock:
+            self._fingerprints.pop(tenant, None)
+
+    def record_transfer(self, wire_bytes: int, body_bytes: int) -> None:
+        """Учёт размера ответа при передаче и после распаковки."""
+        with self._lock:
+            self.wire_bytes += wire_bytes
+            self.body_bytes += body_bytes
+
+    def metrics(self) -> dict:
+        """Попадания в кеш и экономия трафика за счёт сжатия."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'wire_bytes': self.wire_bytes,
+                'body_bytes': self.body_bytes,
+                'bytes_saved': self.body_bytes - self.wire_bytes,
+            }
@@ -0,0 +1,327 @@
+"""
+state.py.
+
+Состояние бота в памяти и его компактные бинарные снимки.
+Снимок читается через mmap лениво: при старте разбирается только
+заголовок, состояние арендатора (tenant) декодируется при первом обращении,
+поэтому бот готов к работе сразу даже при сотнях тысяч арендаторов.
+
+Формат файла (little-endian):
+    заголовок   HEADER
+    индекс      INDEX_ENTRY * count, отсортирован по хешу арендатора
+    записи      RECORD + ключ + last_message + статусы (STATUS_ENTRY + имя)
+                + неотправленные сообщения (OUTBOX_ENTRY + канал + текст)
+Снимки версии 1 (без неотправленных сообщений) читаются
+и при сохранении перекодируются в текущую версию.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import time
+
+from bisect import bisect_left
+
+import constants as const
+
+MAGIC = b'HWBS'
+VERSION = 2
+
+HEADER = struct.Struct('<4sHHI')
+INDEX_ENTRY = struct.Struct('<QQI')
+RECORD = struct.Struct('<HqdIII')
+RECORDS = {
+    1: struct.Struct('<HqdII'),
+    VERSION: RECORD,
+}
+STATUS_ENTRY = struct.Struct('<HB')
+OUTBOX_ENTRY = struct.Struct('<HI')
+
+STATUS_CODES = tuple(const.HOMEWORK_STATUSES)
+STATUS_INDEX = {status: code for code, status in enumerate(STATUS_CODES)}
+
+ENCODING = 'utf-8'
+
+
+def tenant_hash(tenant: str) -> int:
+    """Стабильный между запусками 64-битный хеш идентификатора арендатора."""
+    digest = hashlib.blake2b(tenant.encode(ENCODING), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class TenantState:
+    """
+    Состояние одного арендатора.
+
+    timestamp - курсор from_date для следующего запроса к API
+    due - время следующего опроса (time.time())
+    last_message - последнее отправленное сообщение об ошибке
+    statuses - последние известные статусы работ {homework_name: status}
+    outbox - не доставленные до остановки сообщения [(канал, текст)]
+    """
+
+    __slots__ = ('timestamp', 'due', 'last_message', 'statuses', 'outbox')
+
+    def __init__(self, timestamp: int = 0, due: float = 0.0,
+                 last_message: str = '', statuses: dict = None,
+                 outbox: list = None) -> None:
+        """Создание состояния арендатора."""
+        self.timestamp = timestamp
+        self.due = due
+        self.last_message = last_message
+        self.statuses = {} if statuses is None else statuses
+        self.outbox = [] if outbox is None else outbox
+
+    def encode(self, tenant: str) -> bytes:
+        """Кодирование состояния в запись снимка."""
+        key = tenant.encode(ENCODING)
+        last_message = self.last_message.encode(ENCODING)
+        parts = [
+            RECORD.pack(len(key), self.timestamp, self.due,
+                        len(last_message), len(self.statuses),
+                        len(self.outbox)),
+            key,
+            last_message,
+        ]
+        for name, status in self.statuses.items():
+            encoded_name = name.encode(ENCODING)
+            parts.append(
+                STATUS_ENTRY.pack(len(encoded_name), STATUS_INDEX[status])
+            )
+            parts.append(encoded_name)
+        for channel, message in self.outbox:
+            encoded_channel = channel.encode(ENCODING)
+            encoded_message = message.encode(ENCODING)
+            parts.append(
+                OUTBOX_ENTRY.pack(len(encoded_channel), len(encoded_message))
+            )
+            parts.append(encoded_channel)
+            parts.append(encoded_message)
+        return b''.join(parts)
+
+    @classmethod
+    def decode(cls, buffer, offset: int, version: int = VERSION) -> tuple:
+        """Декодирование записи снимка. Возвращает (tenant, TenantState)."""
+        record = RECORDS[version]
+        fields = record.unpack_from(buffer, offset)
+        key_len, timestamp, due, message_len, statuses_count = fields[:5]
+        outbox_count = fields[5] if len(fields) > 5 else 0
+        offset += record.size
+        tenant = bytes(buffer[offset:offset + key_len]).decode(ENCODING)
+        offset += key_len
+        last_message = bytes(
+            buffer[offset:offset + message_len]
+        ).decode(ENCODING)
+        offset += message_len
+        statuses = {}
+        for _ in range(statuses_count):
+            name_len, code = STATUS_ENTRY.unpack_from(buffer, offset)
+            offset += STATUS_ENTRY.size
+            name = bytes(buffer[offset:offset + name_len]).decode(ENCODING)
+            offset += name_len
+            statuses[name] = STATUS_CODES[code]
+        outbox = []
+        for _ in range(outbox_count):
+            channel_len, text_len = OUTBOX_ENTRY.unpack_from(buffer, offset)
+            offset += OUTBOX_ENTRY.size
+            channel = bytes(
+                buffer[offset:offset + channel_len]
+            ).decode(ENCODING)
+            offset += channel_len
+            text = bytes(buffer[offset:offset + text_len]).decode(ENCODING)
+            offset += text_len
+            outbox.append((channel, text))
+        return tenant, cls(timestamp, due, last_message, statuses, outbox)
+
+
+class Snapshot:
+    """Снимок состояния, отображённый в память только для чтения."""
+
+    def __init__(self, path: str) -> None:
+        """Открытие снимка и проверка заголовка."""
+        self._file = open(path, 'rb')
+        try:
+            self._buffer = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        except ValueError:
+            self._file.close()
+            raise ValueError(f'Пустой файл снимка: {path}')
+        try:
+            magic, self.version, _, self._count = HEADER.unpack_from(
+                self._buffer, 0
+            )
+        except struct.error:
+            self.close()
+            raise ValueError(f'Повреждённый заголовок снимка: {path}')
+        if magic != MAGIC or self.version not in RECORDS:
+            self.close()
+            raise ValueError(f'Неизвестный формат снимка: {path}')
+        self._record = RECORDS[self.version]
+        self._hashes = _IndexHashes(self._buffer, self._count)
+
+    def __len__(self) -> int:
+        """Количество арендаторов в снимке."""
+        return self._count
+
+    def _entry(self, position: int) -> tuple:
+        return INDEX_ENTRY.unpack_from(
+            self._buffer, HEADER.size + position * INDEX_ENTRY.size
+        )
+
+    def record(self, tenant: str):
+        """Сырая запись арендатора (memoryview) или None."""
+        key = tenant.encode(ENCODING)
+        key_hash = tenant_hash(tenant)
+        position = bisect_left(self._hashes, key_hash)
+        while position < self._count:
+            entry_hash, offset, length = self._entry(position)
+            if entry_hash != key_hash:
+                break
+            key_len = self._record.unpack_from(self._buffer, offset)[0]
+            start = offset + self._record.size
+            if self._buffer[start:start + key_len] == key:
+                return memoryview(self._buffer)[offset:offset + length]
+            position += 1
+        return None
+
+    def get(self, tenant: str):
+        """Состояние арендатора из снимка или None."""
+        record = self.record(tenant)
+        if record is None:
+            return None
+        return TenantState.decode(record, 0, self.version)[1]
+
+    def records(self):
+        """Итератор по (tenant, сырая запись) всех арендаторов снимка."""
+        view = memoryview(self._buffer)
+        for position in range(self._count):
+            _, offset, length = self._entry(position)
+            key_len = self._record.unpack_from(self._buffer, offset)[0]
+            start = offset + self._record.size
+            tenant = bytes(view[start:start + key_len]).decode(ENCODING)
+            yield tenant, view[offset:offset + length]
+
+    def close(self) -> None:
+        """Закрытие отображения и файла."""
+        self._buffer.close()
+        self._file.close()
+
+
+class _IndexHashes:
+    """Последовательность хешей индекса снимка для bisect без копирования."""
+
+    def __init__(self, buffer, count: int) -> None:
+        """Обёртка над индексом снимка."""
+        self._buffer = buffer
+        self._count = count
+
+    def __len__(self) -> int:
+        """Количество записей индекса."""
+        return self._count
+
+    def __getitem__(self, position: int) -> int:
+        """Хеш арендатора в позиции position индекса."""
+        return INDEX_ENTRY.unpack_from(
+            self._buffer, HEADER.size + position * INDEX_ENTRY.size
+        )[0]
+
+
+class BotState:
+    """
+    Состояние всех арендаторов бота.
+
+    Изменённые арендаторы хранятся в памяти, остальные читаются
+    из снимка по требованию и при сохранении копируются как есть.
+    """
+
+    def __init__(self, snapshot: Snapshot = None) -> None:
+        """Создание состояния поверх снимка (или пустого)."""
+        self._tenants = {}
+        self._snapshot = snapshot
+        self._saved_at = time.monotonic()
+
+    @classmethod
+    def load(cls, path: str) -> 'BotState':
+        """Загрузка состояния из снимка. Пустое состояние, если снимка нет."""
+        try:
+            return cls(Snapshot(path))
+        except (OSError, ValueError, struct.error):
+            return cls()
+
+    def __contains__(self, tenant: str) -> bool:
+        """Известен ли арендатор состоянию."""
+        return tenant in self._tenants or (
+            self._snapshot is not None
+            and self._snapshot.record(tenant) is not None
+        )
+
+    def __len__(self) -> int:
+        """Количество арендаторов."""
+        return sum(1 for _ in self.tenants())
+
+    def get(self, tenant: str) -> TenantState:
+        """Состояние арендатора. Новый арендатор получает пустое состояние."""
+        tenant_state = self._tenants.get(tenant)
+        if tenant_state is None:
+            if self._snapshot is not None:
+                tenant_state = self._snapshot.get(tenant)
+            if tenant_state is None:
+                tenant_state = TenantState()
+            self._tenants[tenant] = tenant_state
+        return tenant_state
+
+    def tenants(self):
+        """Итератор по идентификаторам всех арендаторов."""
+        yield from self._tenants
+        if self._snapshot is not None:
+            for tenant, _ in self._snapshot.records():
+                if tenant not in self._tenants:
+                    yield tenant
+
+    def _records(self):
+        for tenant, tenant_state in self._tenants.items():
+            yield tenant_hash(tenant), tenant_state.encode(tenant)
+        if self._snapshot is not None:
+            version = self._snapshot.version
+            for tenant, record in self._snapshot.records():
+                if tenant in self._tenants:
+                    continue
+                if version != VERSION:
+                    record = TenantState.decode(record, 0, version)[1].encode(
+                        tenant
+                    )
+                yield tenant_hash(tenant), record
+
+    def save(self, path: str) -> None:
+        """Атомарная запись снимка всех арендаторов."""
+        records = sorted(self._records(), key=lambda record: record[0])
+        offset = HEADER.size + INDEX_ENTRY.size * len(records)
+        index = []
+        for key_hash, record in records:
+            index.append(INDEX_ENTRY.pack(key_hash, offset, len(record)))
+            offset += len(record)
+
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, 0, len(records)))
+            file.write(b''.join(index))
+            for _, record in records:
+                file.write(record)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+        self._saved_at = time.monotonic()
+
+    def save_if_due(self, path: str, interval: float) -> bool:
+        """Запись снимка, если с прошлой записи прошло interval секунд."""
+        if time.monotonic() - self._saved_at < interval:
+            return False
+        self.save(path)
+        return True
+
+    def close(self) -> None:
+        """Закрытие снимка, из которого было загружено состояние."""
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
@@ -0,0 +1,149 @@
+import threading
+import time
+
+import backfill
+import history
+import state
+
+
+def make_fetch(homeworks, current_date=1000198991, delay=0.0, probe=None):
+    def fetch(from_date):
+        assert from_date == 0, (
+            'Убедитесь, что при первичной загрузке запрашивается '
+            'вся история (from_date=0)'
+        )
+        if probe is not None:
+            probe()
+        time.sleep(delay)
+        return {'homeworks': homeworks, 'current_date': current_date}
+    return fetch
+
+
+class TestBackfill:
+
+    def test_seed_latest_statuses_without_messages(self, tmp_path):
+        homeworks = [
+            {'homework_name': 'hw1', 'status': 'approved',
+             'date_updated': '2020-02-14T10:00:00Z'},
+            {'homework_name': 'hw1', 'status': 'reviewing',
+             'date_updated': '2020-02-13T10:00:00Z'},
+            {'homework_name': 'hw2', 'status': 'rejected',
+             'date_updated': '2020-02-13T10:00:00Z'},
+            {'homework_name': 'hw3', 'status': 'unknown'},
+            {'status': 'approved'},
+        ]
+        bot_state = state.BotState()
+        store = history.HistoryStore(str(tmp_path / 'history.sqlite3'))
+        summaries = backfill.backfill(
+            {'1': make_fetch(homeworks)}, bot_state, store
+        )
+        summary = summaries['1']
+        assert summary['homeworks'] == 2
+        assert summary['skipped'] == 2
+        tenant_state = bot_state.get('1')
+        assert tenant_state.statuses == {
+            'hw1': 'approved', 'hw2': 'rejected'
+        }, (
+            'Убедитесь, что в состояние попадает последний статус работы'
+        )
+        assert tenant_state.timestamp == 1000198991
+        assert history.turnaround(store, 'reviewing', ['approved'])[
+            'count'] == 1
+        store.close()
+
+        message = backfill.summary_message(summary)
+        assert message.startswith('Загружена история статусов: 2 работ')
+
+    def test_concurrency_cap_and_errors(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def probe():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+
+        def release(fetch):
+            def wrapped(from_date):
+                try:
+                    return fetch(from_date)
+                finally:
+                    with lock:
+                        active.pop()
+            return wrapped
+
+        tenants = {
+            str(number): release(make_fetch([], delay=0.02, probe=probe))
+            for number in range(8)
+        }
+
+        def broken(from_date):
+            raise ConnectionError('нет сети')
+
+        tenants['broken'] = broken
+        bot_state = state.BotState()
+        summaries = backfill.backfill(tenants, bot_state, concurrency=2)
+        assert max(peak) <= 2, (
+            'Убедитесь, что число одновременных запросов ограничено'
+        )
+        assert len(summaries) == 9
+        assert 'error' in summaries['broken']
+        assert 'нет сети' in backfill.summary_message(summaries['broken'])
+
+    def test_failed_backfill_is_retried(self, monkeypatch, tmp_path):
+        import homework
+        import notifiers
+
+        class Dispatcher(notifiers.Dispatcher):
+            def __init__(self):
+                super().__init__([])
+                self.messages = []
+
+            def dispatch(self, message, channels=None):
+                self.messages.append(message)
+                return []
+
+        def broken(current_timestamp=0):
+            raise ConnectionError('нет сети')
+
+        monkeypatch.setattr(homework, 'get_api_answer', broken)
+        monkeypatch.setattr(homework, 'SNAPSHOT_PATH',
+                            str(tmp_path / 'bot.state'))
+        bot_state = state.BotState()
+        dispatcher = Dispatcher()
+        failure = homework.backfill_new_tenant(
+            dispatcher, bot_state, 'tenant', None
+        )
+        assert 'нет сети' in failure
+        assert 'tenant' not in bot_state, (
+            'Убедитесь, что арендатор с неудачной загрузкой истории '
+            'не сохраняется как известный'
+        )
+        assert homework.backfill_new_tenant(
+            dispatcher, bot_state, 'tenant', None, failure
+        ) == failure
+        assert dispatcher.messages == [failure], (
+            'Убедитесь, что повторная ошибка загрузки истории '
+            'не отправляется снова'
+        )
+        homework.shutdown(
+            dispatcher, bot_state, 'tenant',
+            history.HistoryStore(str(tmp_path / 'history.sqlite3')),
+        )
+        assert 'tenant' not in state.BotState.load(str(tmp_path / 'bot.state'))
+
+        monkeypatch.setattr(
+            homework, 'get_api_answer', make_fetch(
+                [{'homework_name': 'hw1', 'status': 'approved'}]
+            )
+        )
+        bot_state = state.BotState.load(str(tmp_path / 'bot.state'))
+        dispatcher = Dispatcher()
+        assert homework.backfill_new_tenant(
+            dispatcher, bot_state, 'tenant', None, failure
+        ) is None
+        assert 'tenant' in bot_state
+        assert dispatcher.messages[0].startswith(
+            homework.const.LOG_MESSAGES['backfill_done']
+        ), 'Убедитесь, что после успешной загрузки отправляется итог'
@@ -0,0 +1,78 @@
+import argparse
+
+import pytest
+
+from benchmarks import fleet
+
+
+def make_step(tenants, lag_p99, polls=100, cpu=0.5, wall=1.0, p50=10.0):
+    return {
+        'tenants': tenants,
+        'workers': 4,
+        'interval': 1.0,
+        'polls': polls,
+        'errors': 0,
+        'events': 0,
+        'notifications': 0,
+        'cpu': cpu,
+        'cpu_per_poll': cpu / polls,
+        'wall': wall,
+        'memory_per_tenant': 512.0,
+        'latency_ms': {'count': polls, 'p50': p50},
+        'lag_ms': {'count': polls, 'p99': lag_p99},
+    }
+
+
+class TestFleet:
+
+    def test_stub_api_generates_review_events(self):
+        api = fleet.FleetAPI(event_rate=10.0)
+        assert api.answer('tenant', 0, now=1000.0)['homeworks'] == []
+        answer = api.answer('tenant', 0, now=1010.0)
+        assert api.events > 0, (
+            'Убедитесь, что заглушка генерирует события проверки'
+        )
+        statuses = {item['status'] for item in answer['homeworks']}
+        assert statuses <= {'reviewing', 'approved', 'rejected'}
+        assert answer['current_date'] == 1010
+        assert api.answer('tenant', 1011, now=1010.0)['homeworks'] == [], (
+            'Убедитесь, что заглушка отдаёт только изменения с from_date'
+        )
+
+    def test_capacity_finds_point_of_falling_behind(self):
+        steps = [
+            make_step(10, lag_p99=5.0),
+            make_step(20, lag_p99=20.0, p50=30.0),
+            make_step(40, lag_p99=900.0, p50=120.0),
+        ]
+        summary = fleet.capacity(steps, retry_time=600)
+        assert summary['max_sustainable'] == 20
+        assert summary['behind_at_tenants'] == 40, (
+            'Убедитесь, что отставание считается по p99 задержки расписания'
+        )
+        assert summary['behind_latency_ms'] == 120.0
+        assert summary['cpu_per_poll_ms'] == 5.0
+        assert summary['tenants_per_core'] == 120_000
+        assert summary['max_sustainable_per_core'] == 40
+        assert summary['latency_budget_ms'] == 4 * 600 / 20 * 1000
+        assert fleet.report(steps, summary)
+
+    def test_run_step_against_stub(self):
+        with fleet.stub_server(event_rate=20.0) as url:
+            step = fleet.run_step(
+                url, 5, interval=0.2, duration=1.0, workers=2
+            )
+        assert step['polls'] >= 5
+        assert step['errors'] == 0, (
+            'Убедитесь, что бот опрашивает заглушку без ошибок'
+        )
+        assert step['notifications'] > 0, (
+            'Убедитесь, что уведомления доходят до webhook заглушки'
+        )
+
+    def test_tenant_count_must_be_positive(self):
+        with pytest.raises(ValueError):
+            fleet.run_step('http://127.0.0.1:1/', 0)
+        with pytest.raises(argparse.ArgumentTypeError):
+            fleet.positive_int('0')
+        assert fleet.positive_int('3') == 3
@@ -0,0 +1,124 @@
+import threading
+
+import history
+
+
+class TestHistory:
+
+    def test_record_and_turnaround(self, tmp_path):
+        store = history.HistoryStore(str(tmp_path / 'history.sqlite3'))
+        store.record('1', {'homework_name': 'hw1', 'status': 'reviewing',
+                           'date_updated': '2020-02-13T10:00:00Z'})
+        store.record('1', {'homework_name': 'hw1', 'status': 'approved',
+                           'date_updated': '2020-02-13T12:00:00Z'})
+        store.record('1', {'homework_name': 'hw2', 'status': 'reviewing',
+                           'date_updated': '2020-02-13T10:00:00Z'})
+        store.record('1', {'homework_name': 'hw2', 'status': 'rejected',
+                           'date_updated': '2020-02-13T14:00:00Z'})
+        store.record('1', {'homework_name': 'hw2', 'status': 'rejected',
+                           'date_updated': '2020-02-13T14:00:00Z'})
+        assert store.flush() == 5
+
+        approved = history.turnaround(store, 'reviewing', ['approved'])
+        assert approved['count'] == 1
+        assert approved['p50'] == 2 * 3600, (
+            'Убедитесь, что время проверки считается между соседними '
+            'переходами одной работы'
+        )
+        verdicts = history.turnaround(
+            store, 'reviewing', ['approved', 'rejected']
+        )
+        assert verdicts['count'] == 2, (
+            'Убедитесь, что повторные переходы не дублируются в истории'
+        )
+        assert verdicts['max'] == 4 * 3600
+        store.close()
+
+    def test_turnaround_since_keeps_earlier_start(self, tmp_path):
+        store = history.HistoryStore(str(tmp_path / 'since.sqlite3'))
+        store.add_many([
+            ('1', 'hw1', 'reviewing', 100, 0),
+            ('1', 'hw1', 'approved', 300, 0),
+            ('1', 'hw2', 'reviewing', 50, 0),
+            ('1', 'hw2', 'approved', 150, 0),
+        ])
+        stats = history.turnaround(store, 'reviewing', ['approved'], since=200)
+        assert stats['count'] == 1, (
+            'Убедитесь, что начало проверки до since не отбрасывает работу, '
+            'проверенную после since'
+        )
+        assert stats['max'] == 200
+        store.close()
+
+    def test_concurrent_record_and_flush(self, tmp_path):
+        store = history.HistoryStore(str(tmp_path / 'threads.sqlite3'))
+        threads_count, rows = 8, 500
+        errors = []
+
+        def worker(tenant):
+            try:
+                for number in range(rows):
+                    store.record(tenant, {
+                        'homework_name': f'hw{number}',
+                        'status': 'approved',
+                    })
+                    store.flush()
+            except Exception as error:
+                errors.append(error)
+
+        threads = [
+            threading.Thread(target=worker, args=(str(tenant),))
+            for tenant in range(threads_count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        count = store._connection.execute(
+            'SELECT COUNT(*) FROM transitions'
+        ).fetchone()[0]
+        assert count == threads_count * rows, (
+            'Убедитесь, что записи из нескольких потоков не теряются'
+        )
+        store.close()
+
+    def test_describe_percentiles(self):
+        stats = history.describe([1.0, 2.0, 3.0, 4.0, 5.0])
+        assert stats['count'] == 5
+        assert stats['p50'] == 3.0
+        assert stats['p90'] == 4.6
+        assert history.describe([]) == {'count': 0}
+
+    def test_bulk_analytics(self, tmp_path):
+        store = history.HistoryStore(str(tmp_path / 'bulk.sqlite3'))
+        homeworks = 100_000
+        store.add_many(
+            row
+            for number in range(homeworks)
+            for row in (
+                ('1', f'hw{number}', 'reviewing', number, 0),
+                ('1', f'hw{number}', 'approved', number + 60, 0),
+            )
+        )
+        stats = history.turnaround(store, 'reviewing', ['approved'])
+        assert stats['count'] == homeworks
+        assert stats['p90'] == 60
+        recent = history.turnaround(
+            store, 'reviewing', ['approved'], since=homeworks
+        )
+        assert recent['count'] == 60
+
+        for where, params in (('', (0,)), (history.TURNAROUND_SINCE, (1, 1))):
+            query = history.TURNAROUND.format(where=where, statuses='?')
+            plan = ' '.join(
+                row[-1] for row in store._connection.execute(
+                    f'EXPLAIN QUERY PLAN {query}',
+                    (*params, 'reviewing', 'approved'),
+                )
+            )
+            assert 'TEMP B-TREE' not in plan, (
+                'Убедитесь, что окно LAG читается в порядке индекса '
+                f'без сортировки: {plan}'
+            )
+        store.close()
@@ -0,0 +1,72 @@
+import json
+
+from benchmarks import hot_path
+
+
+class TestHotPath:
+
+    def test_payload_contains_malformed_items(self):
+        import homework
+
+        payload = hot_path.make_payload(100)
+        parsed, errors = homework.parse_statuses(payload['homeworks'])
+        assert len(parsed) == 90
+        assert len(errors) == 10
+
+    def test_run_covers_hot_path(self):
+        results = hot_path.run(
+            sizes=(1, 10), warmup=1, repeat=3, min_sample_ns=10_000
+        )
+        for name in ('check_response', 'parse_status', 'parse_statuses',
+                     'get_api_answer', 'poll_api_answer_unchanged',
+                     'send_new_statuses'):
+            assert set(results[name]) == {'1', '10'}, (
+                f'Убедитесь, что бенчмарк покрывает {name}'
+            )
+            assert results[name]['10']['per_item_ns'] > 0
+        json.dumps(results)
+
+    def test_compare_detects_regression(self):
+        baseline = {'parse_status': {'100': {
+            'min_ns': 10_000.0, 'per_item_ns': 100.0,
+        }}}
+        slow = {'parse_status': {'100': {
+            'min_ns': 20_000.0, 'per_item_ns': 200.0,
+        }}}
+        fast = {'parse_status': {'100': {
+            'min_ns': 12_000.0, 'per_item_ns': 120.0,
+        }}}
+        assert hot_path.compare(slow, baseline, threshold=0.5), (
+            'Убедитесь, что рост стоимости работы выше порога '
+            'считается регрессией'
+        )
+        assert not hot_path.compare(fast, baseline, threshold=0.5)
+        assert not hot_path.compare(slow, {}, threshold=0.5)
+
+    def test_compare_fixed_cost_per_call(self):
+        baseline = {'check_response': {'10000': {
+            'min_ns': 1_000.0, 'per_item_ns': 0.1,
+        }}}
+        slow = {'check_response': {'10000': {
+            'min_ns': 2_000.0, 'per_item_ns': 0.2,
+        }}}
+        assert hot_path.compare(
+            slow, baseline, threshold=0.5, noise_floor_ns=100
+        ), (
+            'Убедитесь, что проверка с фиксированной стоимостью '
+            'сравнивается по времени вызова'
+        )
+
+    def test_compare_ignores_noise(self):
+        baseline = {'check_response': {'1': {
+            'min_ns': 100.0, 'per_item_ns': 100.0,
+        }}}
+        jitter = {'check_response': {'1': {
+            'min_ns': 300.0, 'per_item_ns': 300.0,
+        }}}
+        assert not hot_path.compare(
+            jitter, baseline, threshold=0.5, noise_floor_ns=250
+        ), 'Убедитесь, что рост ниже абсолютного порога шума не регрессия'
+        assert hot_path.compare(
+            jitter, baseline, threshold=0.5, noise_floor_ns=100
+        )
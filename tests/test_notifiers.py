@@ -0,0 +1,158 @@
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import exceptions as exp
+import notifiers
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        self.server.received.append(json.loads(self.rfile.read(length)))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost')
+        data, lines = False, []
+        for raw in self.rfile:
+            line = raw.decode().rstrip('\r\n')
+            if data:
+                if line == '.':
+                    data = False
+                    self.server.received.append('\n'.join(lines))
+                    lines = []
+                    self.reply('250 OK')
+                else:
+                    lines.append(line)
+                continue
+            command = line[:4].upper()
+            if command == 'DATA':
+                data = True
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('250 localhost')
+
+
+def start_server(server):
+    server.received = []
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+class SlowNotifier(notifiers.Notifier):
+    name = 'slow'
+
+    def deliver(self, message):
+        time.sleep(0.5)
+
+
+class BrokenNotifier(notifiers.Notifier):
+    name = 'broken'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.attempts = 0
+
+    def deliver(self, message):
+        self.attempts += 1
+        raise ConnectionError('недоступен')
+
+
+class TestNotifiers:
+
+    def test_webhook_and_smtp_backends(self):
+        webhook = start_server(
+            ThreadingHTTPServer(('127.0.0.1', 0), WebhookHandler)
+        )
+        smtp = start_server(
+            socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPHandler)
+        )
+        try:
+            dispatcher = notifiers.Dispatcher([
+                notifiers.WebhookNotifier(
+                    f'http://127.0.0.1:{webhook.server_port}/hook'
+                ),
+                notifiers.SmtpNotifier(
+                    '127.0.0.1', smtp.server_address[1],
+                    'bot@localhost', ['student@localhost'],
+                ),
+            ])
+            dispatcher.dispatch('первое')
+            futures = dispatcher.dispatch('второе')
+            assert all(future.result(timeout=5) for future in futures)
+            dispatcher.close()
+        finally:
+            webhook.shutdown()
+            smtp.shutdown()
+
+        assert webhook.received == [{'text': 'первое'}, {'text': 'второе'}]
+        assert len(smtp.received) == 2
+        assert smtp.connections == 1, (
+            'Убедитесь, что SMTP-соединение переиспользуется между письмами'
+        )
+
+    def test_slow_backend_does_not_block_others(self):
+        delivered = []
+        timeouts = []
+
+        def send(message, timeout):
+            delivered.append(message)
+            timeouts.append(timeout)
+
+        dispatcher = notifiers.Dispatcher([
+            SlowNotifier(),
+            notifiers.TelegramNotifier(send, timeout=3),
+        ])
+        started = time.perf_counter()
+        slow, fast = dispatcher.dispatch('сообщение')
+        assert time.perf_counter() - started < 0.1, (
+            'Убедитесь, что dispatch не ждёт доставки'
+        )
+        assert fast.result(timeout=1)
+        assert not slow.done(), (
+            'Убедитесь, что медленный канал не задерживает остальные'
+        )
+        assert delivered == ['сообщение']
+        assert timeouts == [3], (
+            'Убедитесь, что таймаут канала передаётся в отправку Telegram'
+        )
+        dispatcher.close()
+        assert slow.result()
+
+    def test_retries_then_notifier_exception(self):
+        broken = BrokenNotifier(retries=2, backoff=0)
+        try:
+            broken.send('сообщение')
+        except exp.Notifier_Exception:
+            pass
+        else:
+            assert False, (
+                'Убедитесь, что после всех повторов выбрасывается '
+                'Notifier_Exception'
+            )
+        assert broken.attempts == 3
+
+        dispatcher = notifiers.Dispatcher([BrokenNotifier(backoff=0)])
+        assert dispatcher.dispatch('сообщение')[0].result(timeout=1) is False
+        dispatcher.close()
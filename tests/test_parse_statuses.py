@@ -0,0 +1,67 @@
+class TestParseStatuses:
+    HOMEWORKS = [
+        {'homework_name': 'hw1', 'status': 'approved'},
+        {'homework_name': 'hw2'},
+        {'homework_name': 'hw3', 'status': 'unknown'},
+        ['not', 'a', 'dict'],
+        {'homework_name': 'hw4', 'status': ['unhashable']},
+        {'homework_name': 'hw5', 'status': 'rejected'},
+    ]
+
+    def test_parse_statuses_collects_errors(self):
+        import homework
+
+        parsed, errors = homework.parse_statuses(self.HOMEWORKS)
+        assert [hw['homework_name'] for hw, _ in parsed] == ['hw1', 'hw5'], (
+            'Убедитесь, что некорректные работы не прерывают обработку списка'
+        )
+        for hw, message in parsed:
+            assert message == homework.parse_status(hw), (
+                'Убедитесь, что пакетная обработка возвращает те же '
+                'сообщения, что и parse_status'
+            )
+        assert len(errors) == 4
+        assert isinstance(errors[0][1], KeyError)
+        assert isinstance(errors[1][1], ValueError)
+
+    def test_parse_tenants_statuses(self):
+        import homework
+
+        result = homework.parse_tenants_statuses({
+            'first': self.HOMEWORKS,
+            'second': [],
+        })
+        assert len(result['first'][0]) == 2
+        assert result['second'] == ([], [])
+
+    def test_failure_report_is_bounded(self, tmp_path):
+        import history
+        import homework
+        import state
+
+        class Dispatcher:
+            def __init__(self):
+                self.messages = []
+
+            def dispatch(self, message):
+                self.messages.append(message)
+
+        malformed = [
+            {'homework_name': f'hw{number}', 'lesson_name': 'x' * 500}
+            for number in range(50)
+        ]
+        dispatcher = Dispatcher()
+        store = history.HistoryStore(str(tmp_path / 'history.sqlite3'))
+        homework.process_answer(
+            dispatcher, 'tenant', state.TenantState(),
+            {'homeworks': malformed + self.HOMEWORKS}, store,
+        )
+        store.close()
+        failure = dispatcher.messages[-1]
+        assert len(failure) < 4096, (
+            'Убедитесь, что сообщение о сбое укладывается в ограничение '
+            'длины сообщения Telegram'
+        )
+        assert 'API: 54;' in failure, (
+            'Убедитесь, что сообщение о сбое содержит число некорректных работ'
+        )
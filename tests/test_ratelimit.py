@@ -0,0 +1,93 @@
+import threading
+from http import HTTPStatus
+
+import ratelimit
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter:
+
+    def test_aimd_rate_adaptation(self):
+        limiter = ratelimit.RateLimiter(
+            rate=1.0, max_rate=1.2, min_rate=0.1, clock=FakeClock()
+        )
+        limiter.feedback(HTTPStatus.OK)
+        limiter.feedback(HTTPStatus.OK)
+        limiter.feedback(HTTPStatus.OK)
+        assert limiter.rate == 1.2, (
+            'Убедитесь, что после успешных ответов скорость растёт '
+            'до max_rate'
+        )
+        limiter.feedback(HTTPStatus.TOO_MANY_REQUESTS)
+        assert limiter.rate == 0.6, (
+            'Убедитесь, что после 429 скорость уменьшается'
+        )
+        metrics = limiter.metrics()
+        assert metrics['rate_limited'] == 1
+        assert metrics['rate'] == 0.6
+
+    def test_retry_after_blocks_tokens(self):
+        clock = FakeClock()
+        limiter = ratelimit.RateLimiter(rate=100.0, clock=clock)
+        limiter.feedback(HTTPStatus.TOO_MANY_REQUESTS, retry_after='30')
+        assert limiter.metrics()['blocked_for'] == 30
+        assert not limiter.acquire(timeout=0), (
+            'Убедитесь, что токены не выдаются до истечения Retry-After'
+        )
+        clock.now = 31.0
+        assert limiter.acquire(timeout=0)
+
+    def test_parse_retry_after(self):
+        assert ratelimit.parse_retry_after('120') == 120
+        assert ratelimit.parse_retry_after(None) == 0
+        assert ratelimit.parse_retry_after('garbage') == 0
+        assert ratelimit.parse_retry_after(
+            'Wed, 21 Oct 2015 07:28:30 GMT', now=1445412480
+        ) == 30
+        for value in ('inf', 'nan', '-inf'):
+            assert ratelimit.parse_retry_after(value) == 0, (
+                'Убедитесь, что бесконечный Retry-After не блокирует запросы'
+            )
+        assert ratelimit.parse_retry_after(
+            str(7 * 24 * 3600)
+        ) == ratelimit.MAX_RETRY_AFTER, (
+            'Убедитесь, что задержка Retry-After ограничена сверху'
+        )
+
+    def test_tenants_served_in_turn(self):
+        limiter = ratelimit.RateLimiter(rate=200.0, max_rate=200.0, burst=1)
+        served = []
+        lock = threading.Lock()
+
+        def worker(tenant, count):
+            for _ in range(count):
+                limiter.acquire(tenant)
+                with lock:
+                    served.append(tenant)
+
+        threads = [
+            threading.Thread(target=worker, args=('greedy', 20)),
+            threading.Thread(target=worker, args=('quiet', 3)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(served) == 23
+        assert served.index('quiet') < 10 and max(
+            position for position, tenant in enumerate(served)
+            if tenant == 'quiet'
+        ) < 15, (
+            'Убедитесь, что токены распределяются между арендаторами '
+            f'по очереди: {served}'
+        )
+        assert limiter.metrics()['throttled'] > 0
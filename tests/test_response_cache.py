@@ -0,0 +1,64 @@
+import json
+
+import requests
+
+import response_cache
+
+
+class MockRawResponse:
+
+    def __init__(self, body, headers=None):
+        self.status_code = 200
+        self.content = body
+        self.headers = headers or {}
+
+
+class TestResponseCache:
+
+    def test_fingerprint_ignores_current_date(self):
+        first = b'{"homeworks": [], "current_date": 1000198000}'
+        second = b'{"homeworks": [], "current_date": 1000198991}'
+        changed = (b'{"homeworks": [{"status": "approved"}], '
+                   b'"current_date": 1000198991}')
+        assert (response_cache.fingerprint(first)
+                == response_cache.fingerprint(second)), (
+            'Убедитесь, что current_date не влияет на отпечаток ответа'
+        )
+        assert (response_cache.fingerprint(first)
+                != response_cache.fingerprint(changed))
+
+    def test_poll_skips_unchanged_body(self, monkeypatch):
+        bodies = [
+            json.dumps({'homeworks': [], 'current_date': date}).encode()
+            for date in (1, 2)
+        ]
+        requested_headers = []
+
+        def mock_get(url, headers=None, params=None, **kwargs):
+            requested_headers.append(headers)
+            return MockRawResponse(
+                bodies.pop(0), headers={'Content-Length': '20'}
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+
+        import homework
+
+        monkeypatch.setattr(homework, 'api_cache',
+                            response_cache.ResponseCache())
+        response, body_fingerprint = homework.poll_api_answer(
+            0, homework.HEADERS, 'tenant'
+        )
+        assert response == {'homeworks': [], 'current_date': 1}
+        homework.api_cache.remember('tenant', body_fingerprint)
+
+        response, _ = homework.poll_api_answer(0, homework.HEADERS, 'tenant')
+        assert response is None, (
+            'Убедитесь, что неизменившийся ответ не декодируется повторно'
+        )
+        assert 'gzip' in requested_headers[0]['Accept-Encoding']
+        metrics = homework.api_cache.metrics()
+        assert metrics['hits'] == 1
+        assert metrics['misses'] == 1
+        assert metrics['wire_bytes'] == 40
+        assert metrics['bytes_saved'] == metrics['body_bytes'] - 40
@@ -0,0 +1,236 @@
+import signal
+import threading
+import time
+from http import HTTPStatus
+
+import history
+import notifiers
+import ratelimit
+import state
+
+
+class SlowNotifier(notifiers.Notifier):
+    name = 'slow'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.delivered = []
+
+    def deliver(self, message):
+        time.sleep(0.3)
+        self.delivered.append(message)
+
+
+class FlakyNotifier(notifiers.Notifier):
+    name = 'flaky'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.attempts = 0
+
+    def deliver(self, message):
+        self.attempts += 1
+        raise ConnectionError('недоступен')
+
+
+class RecordingNotifier(notifiers.Notifier):
+    name = 'fast'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.delivered = []
+
+    def deliver(self, message):
+        self.delivered.append(message)
+
+
+class TestShutdown:
+
+    def test_dispatcher_drain_returns_undelivered(self):
+        fast = RecordingNotifier()
+        slow = SlowNotifier()
+        dispatcher = notifiers.Dispatcher([slow, fast])
+        for number in range(3):
+            dispatcher.dispatch(f'сообщение {number}')
+        undelivered = dispatcher.close(timeout=0.1)
+        assert fast.delivered == [
+            'сообщение 0', 'сообщение 1', 'сообщение 2'
+        ]
+        assert slow.delivered == ['сообщение 0'], (
+            'Убедитесь, что отправляемое при остановке сообщение '
+            'доотправляется'
+        )
+        assert undelivered == [
+            ('slow', 'сообщение 1'),
+            ('slow', 'сообщение 2'),
+        ], (
+            'Убедитесь, что для повторной отправки сохраняются только '
+            'сообщения, отправка которых не начиналась'
+        )
+        time.sleep(0.4)
+        assert slow.delivered == ['сообщение 0'], (
+            'Убедитесь, что сохранённые сообщения не отправляются '
+            'после остановки'
+        )
+
+    def test_dispatcher_drain_cancels_retries(self):
+        flaky = FlakyNotifier(retries=5, backoff=10)
+        dispatcher = notifiers.Dispatcher([flaky])
+        dispatcher.dispatch('статус')
+        started = time.perf_counter()
+        undelivered = dispatcher.close(timeout=0.1)
+        assert time.perf_counter() - started < 5, (
+            'Убедитесь, что остановка прерывает ожидание повтора'
+        )
+        assert flaky.attempts == 1
+        assert undelivered == [('flaky', 'статус')]
+
+    def test_signal_stops_polling(self, monkeypatch):
+        import homework
+
+        def fail_poll(*args, **kwargs):
+            assert False, 'Опрос API после сигнала остановки'
+
+        monkeypatch.setattr(homework, 'poll_api_answer', fail_poll)
+        homework.handle_shutdown(signal.SIGTERM, None)
+        try:
+            assert homework.shutdown_event.is_set()
+            bot_state = state.BotState()
+            homework.poll(None, bot_state, 'tenant', None)
+        finally:
+            homework.shutdown_event.clear()
+
+    def test_network_error_does_not_stop_polling(self, monkeypatch,
+                                                 tmp_path):
+        import requests
+
+        import homework
+
+        attempts = []
+
+        def timeout(*args, **kwargs):
+            attempts.append(1)
+            if len(attempts) == 2:
+                homework.shutdown_event.set()
+            raise requests.exceptions.ReadTimeout('таймаут')
+
+        class Dispatcher:
+            def __init__(self):
+                self.messages = []
+
+            def dispatch(self, message):
+                self.messages.append(message)
+
+        monkeypatch.setattr(homework, 'poll_api_answer', timeout)
+        monkeypatch.setattr(homework, 'RETRY_TIME', 0)
+        monkeypatch.setattr(homework, 'SNAPSHOT_PATH',
+                            str(tmp_path / 'bot.state'))
+        dispatcher = Dispatcher()
+        try:
+            homework.poll(dispatcher, state.BotState(), 'tenant', None)
+        finally:
+            homework.shutdown_event.clear()
+        assert len(attempts) == 2, (
+            'Убедитесь, что сетевая ошибка не останавливает цикл опроса'
+        )
+        assert len(dispatcher.messages) == 1
+        assert 'таймаут' in dispatcher.messages[0]
+
+    def test_snapshot_write_error_does_not_stop_polling(self, monkeypatch,
+                                                        tmp_path):
+        import homework
+
+        attempts = []
+
+        def unchanged(*args, **kwargs):
+            attempts.append(1)
+            if len(attempts) == 2:
+                homework.shutdown_event.set()
+            return None, b''
+
+        monkeypatch.setattr(homework, 'poll_api_answer', unchanged)
+        monkeypatch.setattr(homework, 'RETRY_TIME', 0)
+        monkeypatch.setattr(homework, 'SNAPSHOT_INTERVAL', 0)
+        monkeypatch.setattr(homework, 'SNAPSHOT_PATH',
+                            str(tmp_path / 'missing' / 'bot.state'))
+        try:
+            homework.poll(None, state.BotState(), 'tenant', None)
+        finally:
+            homework.shutdown_event.clear()
+        assert len(attempts) == 2, (
+            'Убедитесь, что ошибка записи снимка не останавливает опрос'
+        )
+
+    def test_signal_interrupts_rate_limiter_wait(self, monkeypatch):
+        import homework
+
+        limiter = ratelimit.RateLimiter()
+        limiter.feedback(HTTPStatus.TOO_MANY_REQUESTS, retry_after='600')
+        monkeypatch.setattr(homework, 'rate_limiter', limiter)
+        errors = []
+
+        def request():
+            try:
+                homework.request_api_answer(0, {}, 'tenant')
+            except Exception as error:
+                errors.append(error)
+
+        thread = threading.Thread(target=request, daemon=True)
+        thread.start()
+        time.sleep(0.1)
+        try:
+            homework.handle_shutdown(signal.SIGTERM, None)
+            thread.join(timeout=5)
+        finally:
+            homework.shutdown_event.clear()
+        assert not thread.is_alive(), (
+            'Убедитесь, что сигнал остановки прерывает ожидание '
+            'ограничителя частоты после Retry-After'
+        )
+        assert isinstance(
+            errors[0], homework.exp.API_Ya_Practicum_Exception_Endpoint
+        )
+
+    def test_shutdown_persists_outbox_and_resends(self, monkeypatch,
+                                                  tmp_path):
+        import homework
+
+        snapshot = str(tmp_path / 'bot.state')
+        monkeypatch.setattr(homework, 'SNAPSHOT_PATH', snapshot)
+        monkeypatch.setattr(homework, 'DRAIN_TIMEOUT', 0.05)
+        bot_state = state.BotState()
+        bot_state.get('tenant').timestamp = 1000198000
+        dispatcher = notifiers.Dispatcher([SlowNotifier()])
+        dispatcher.dispatch('отправляется')
+        dispatcher.dispatch('статус')
+        homework.shutdown(
+            dispatcher, bot_state, 'tenant',
+            history.HistoryStore(str(tmp_path / 'history.sqlite3')),
+        )
+
+        restored = state.BotState.load(snapshot)
+        tenant_state = restored.get('tenant')
+        assert tenant_state.timestamp == 1000198000
+        assert ('slow', 'статус') in tenant_state.outbox, (
+            'Убедитесь, что неотправленные сообщения сохраняются в снимок'
+        )
+        assert ('slow', homework.const.LOG_MESSAGES['app_stop']) not in (
+            tenant_state.outbox
+        ), 'Убедитесь, что сообщение об остановке не сохраняется'
+        assert ('slow', 'отправляется') not in tenant_state.outbox, (
+            'Убедитесь, что доотправленное сообщение не сохраняется '
+            'для повторной отправки'
+        )
+
+        fast = RecordingNotifier()
+        fast.name = 'slow'
+        dispatcher = notifiers.Dispatcher([fast, RecordingNotifier()])
+        homework.resend_outbox(dispatcher, tenant_state)
+        dispatcher.close()
+        assert 'статус' in fast.delivered
+        assert dispatcher.notifiers[1].delivered == [], (
+            'Убедитесь, что сообщение повторно отправляется только в тот '
+            'канал, куда не было доставлено'
+        )
+        assert tenant_state.outbox == []
+        restored.close()
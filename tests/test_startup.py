@@ -0,0 +1,60 @@
+import os
+
+from benchmarks import startup
+
+# Запас на медленные и загруженные машины CI: тест ловит тяжёлые
+# импорты, а бюджет IMPORT_BUDGET_US проверяет python -m benchmarks.startup
+STARTUP_TEST_BUDGET_US = 10 * startup.IMPORT_BUDGET_US
+
+
+class TestStartup:
+
+    def test_no_heavy_imports_on_startup(self):
+        records = startup.measure_imports()
+        assert records, (
+            'Проверьте, что отчёт `-X importtime` удалось разобрать'
+        )
+        loaded = {name for _, _, name in records}
+        assert startup.MODULE in loaded
+        errors = startup.check_startup(
+            records, budget_us=STARTUP_TEST_BUDGET_US
+        )
+        assert not errors, (
+            'Убедитесь, что при импорте homework не загружаются тяжёлые '
+            f'модули и старт не замедлился многократно: {errors}'
+        )
+
+    def test_check_startup_detects_slow_import(self):
+        records = [(10, startup.IMPORT_BUDGET_US + 1, startup.MODULE)]
+        assert startup.check_startup(records), (
+            'Убедитесь, что check_startup сообщает о превышении бюджета'
+        )
+        assert not startup.check_startup(records, budget_us=None)
+
+    def test_check_startup_detects_heavy_module(self):
+        records = [
+            (10, 10, 'telegram'),
+            (10, 20, startup.MODULE),
+        ]
+        errors = startup.check_startup(records)
+        assert errors, (
+            'Убедитесь, что check_startup сообщает о загрузке '
+            'тяжёлого модуля'
+        )
+
+    def test_optional_settings_read_from_env_file(self, monkeypatch,
+                                                  tmp_path):
+        import homework
+
+        env_path = tmp_path / '.env'
+        env_path.write_text('WEBHOOK_URL=http://localhost/hook\n')
+        for var in homework.ENV_VARS:
+            monkeypatch.setenv(var, 'set')
+        monkeypatch.delenv('WEBHOOK_URL', raising=False)
+        monkeypatch.setattr(homework, 'ENV_PATH', str(env_path))
+        homework.load_env()
+        assert os.environ.get('WEBHOOK_URL') == 'http://localhost/hook', (
+            'Убедитесь, что необязательные переменные читаются из env-файла, '
+            'даже если обязательные заданы в окружении'
+        )
+        monkeypatch.delenv('WEBHOOK_URL')
@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+import state
+
+
+class TestState:
+
+    def test_snapshot_roundtrip(self, tmp_path):
+        path = str(tmp_path / 'bot.state')
+        bot_state = state.BotState()
+        tenant_state = bot_state.get('12345')
+        tenant_state.timestamp = 1000198000
+        tenant_state.due = 1000198600.5
+        tenant_state.last_message = 'Сбой в работе программы'
+        tenant_state.statuses = {'hw1': 'approved', 'hw2': 'reviewing'}
+        tenant_state.outbox = [('telegram', 'Изменился статус')]
+        bot_state.save(path)
+
+        loaded = state.BotState.load(path)
+        assert '12345' in loaded, (
+            'Убедитесь, что арендатор сохраняется в снимок'
+        )
+        restored = loaded.get('12345')
+        assert restored.timestamp == tenant_state.timestamp
+        assert restored.due == tenant_state.due
+        assert restored.last_message == tenant_state.last_message
+        assert restored.statuses == tenant_state.statuses
+        assert restored.outbox == tenant_state.outbox
+        assert 'unknown' not in loaded
+        loaded.close()
+
+    def test_load_version_1_snapshot(self, tmp_path):
+        path = str(tmp_path / 'v1.state')
+        key = b'12345'
+        record = state.RECORDS[1].pack(len(key), 1000198000, 0.0, 0, 1)
+        record += key + state.STATUS_ENTRY.pack(3, 0) + b'hw1'
+        offset = state.HEADER.size + state.INDEX_ENTRY.size
+        with open(path, 'wb') as file:
+            file.write(state.HEADER.pack(state.MAGIC, 1, 0, 1))
+            file.write(state.INDEX_ENTRY.pack(
+                state.tenant_hash('12345'), offset, len(record)
+            ))
+            file.write(record)
+
+        loaded = state.BotState.load(path)
+        restored = loaded.get('12345')
+        assert restored.timestamp == 1000198000
+        assert restored.statuses == {'hw1': state.STATUS_CODES[0]}
+        assert restored.outbox == []
+        loaded.close()
+
+        upgraded_path = str(tmp_path / 'v2.state')
+        loaded = state.BotState.load(path)
+        loaded.get('other')
+        loaded.save(upgraded_path)
+        loaded.close()
+        upgraded = state.BotState.load(upgraded_path)
+        assert upgraded.get('12345').timestamp == 1000198000, (
+            'Убедитесь, что снимок версии 1 перекодируется при сохранении'
+        )
+        upgraded.close()
+
+    def test_load_missing_or_broken_snapshot(self, tmp_path):
+        assert len(state.BotState.load(str(tmp_path / 'missing'))) == 0
+        broken = tmp_path / 'broken'
+        broken.write_bytes(b'not a snapshot')
+        assert len(state.BotState.load(str(broken))) == 0, (
+            'Убедитесь, что повреждённый снимок не мешает старту бота'
+        )
+
+    def test_short_snapshot_is_closed(self, tmp_path):
+        short = tmp_path / 'short'
+        short.write_bytes(b'HWB')
+        open_files = len(os.listdir('/proc/self/fd'))
+        with pytest.raises(ValueError):
+            state.Snapshot(str(short))
+        assert len(os.listdir('/proc/self/fd')) == open_files, (
+            'Убедитесь, что файл снимка с обрезанным заголовком закрывается'
+        )
+
+    def test_large_fleet_warm_start(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'fleet.state')
+        fleet_size = 100_000
+        bot_state = state.BotState()
+        for tenant in range(fleet_size):
+            tenant_state = bot_state.get(str(tenant))
+            tenant_state.timestamp = tenant
+            tenant_state.statuses[f'hw{tenant}'] = 'approved'
+        bot_state.save(path)
+
+        decode = state.TenantState.decode
+        decoded = []
+
+        def counting_decode(cls, *args, **kwargs):
+            decoded.append(cls)
+            return decode(*args, **kwargs)
+
+        monkeypatch.setattr(
+            state.TenantState, 'decode', classmethod(counting_decode)
+        )
+        loaded = state.BotState.load(path)
+        restored = loaded.get(str(fleet_size - 1))
+        assert restored.timestamp == fleet_size - 1
+        assert restored.statuses == {f'hw{fleet_size - 1}': 'approved'}
+        assert len(decoded) == 1, (
+            'Убедитесь, что загрузка снимка не декодирует всех арендаторов '
+            f'сразу: декодировано {len(decoded)}'
+        )
+        monkeypatch.undo()
+
+        restored.timestamp = 1
+        loaded.save(path)
+        loaded.close()
+        reloaded = state.BotState.load(path)
+        assert len(reloaded) == fleet_size, (
+            'Убедитесь, что при сохранении не теряются арендаторы, '
+            'которые не загружались из снимка'
+        )
+        assert reloaded.get(str(fleet_size - 1)).timestamp == 1
+        assert reloaded.get('0').statuses == {'hw0': 'approved'}
+        reloaded.close()
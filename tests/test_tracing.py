@@ -0,0 +1,91 @@
+import json
+
+import notifiers
+import tracing
+
+
+class RecordingNotifier(notifiers.Notifier):
+    name = 'recording'
+
+    def deliver(self, message):
+        pass
+
+
+def read_spans(path):
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line) for line in file]
+
+
+class TestTracing:
+
+    def test_sampled_spans_exported_in_batches(self, tmp_path):
+        path = str(tmp_path / 'traces.jsonl')
+        tracer = tracing.Tracer(
+            tracing.JsonLinesExporter(path, batch_size=2), sample_rate=1.0
+        )
+        with tracer.span('poll', tenant='12345') as root:
+            with tracer.span('get_api_answer') as span:
+                span.set_attribute('http.status', 200)
+            try:
+                with tracer.span('decode'):
+                    raise ValueError('bad json')
+            except ValueError:
+                pass
+        tracer.close()
+
+        spans = {span['name']: span for span in read_spans(path)}
+        assert set(spans) == {'poll', 'get_api_answer', 'decode'}
+        assert spans['poll']['attributes'] == {'tenant': '12345'}
+        assert spans['poll']['parent_id'] is None
+        for name in ('get_api_answer', 'decode'):
+            assert spans[name]['trace_id'] == root.trace_id
+            assert spans[name]['parent_id'] == root.span_id, (
+                'Убедитесь, что дочерние span ссылаются на span итерации'
+            )
+        assert spans['get_api_answer']['attributes']['http.status'] == 200
+        assert 'bad json' in spans['decode']['attributes']['error']
+        assert tracer.current() is None
+
+    def test_unsampled_spans_are_noop(self, tmp_path, monkeypatch):
+        path = tmp_path / 'traces.jsonl'
+        tracer = tracing.Tracer(
+            tracing.JsonLinesExporter(str(path)), sample_rate=0.0
+        )
+
+        def no_span(*args, **kwargs):
+            raise AssertionError('span создан для невыбранной итерации')
+
+        monkeypatch.setattr(tracing, 'Span', no_span)
+        for _ in range(1000):
+            with tracer.span('poll') as root:
+                with tracer.span('parse_status') as child:
+                    child.set_attribute('homeworks', 1)
+            assert root is tracing.NOOP_SPAN and child is tracing.NOOP_SPAN, (
+                'Убедитесь, что невыбранные итерации не замеряются'
+            )
+        assert tracer.current() is None
+        tracer.close()
+        assert not path.exists() or not path.read_text()
+
+    def test_send_message_span_joins_iteration_trace(self, tmp_path):
+        path = str(tmp_path / 'traces.jsonl')
+        tracing.tracer.configure(
+            tracing.JsonLinesExporter(path), sample_rate=1.0
+        )
+        try:
+            dispatcher = notifiers.Dispatcher([RecordingNotifier()])
+            with tracing.tracer.span('poll', tenant='12345') as root:
+                dispatcher.dispatch('сообщение')
+            dispatcher.close()
+        finally:
+            tracing.tracer.close()
+
+        spans = {span['name']: span for span in read_spans(path)}
+        send = spans['send_message']
+        assert send['trace_id'] == root.trace_id, (
+            'Убедитесь, что отправка в потоке канала попадает '
+            'в трассировку итерации'
+        )
+        assert send['parent_id'] == root.span_id
+        assert send['attributes']['channel'] == 'recording'
+        assert send['attributes']['queued_ms'] >= 0
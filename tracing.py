@@ -0,0 +1,255 @@
+"""
+tracing.py.
+
+Лёгкая трассировка итераций цикла опроса.
+Корневой span итерации выбирается с вероятностью sample_rate; у
+невыбранных итераций все span'ы - общий пустой объект без замеров.
+Завершённые span'ы копятся в экспортёре и записываются пачками
+из фонового потока в JSON-lines файл или отправляются на коллектор.
+"""
+import json
+import logging
+import random
+import threading
+import time
+
+TRACE_BATCH = 100
+TRACE_FLUSH_INTERVAL = 5.0
+
+_local = threading.local()
+
+
+def _stack() -> list:
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _new_id() -> str:
+    return f'{random.getrandbits(64):016x}'
+
+
+class NoopSpan:
+    """Span невыбранной итерации: ничего не замеряет и не экспортирует."""
+
+    sampled = False
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value) -> None:
+        """Атрибут не сохраняется."""
+
+    def __enter__(self) -> 'NoopSpan':
+        """Span становится текущим, чтобы дочерние тоже были пустыми."""
+        _stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        """Снятие span со стека."""
+        _stack().pop()
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Span:
+    """Замер одного участка итерации."""
+
+    __slots__ = ('_tracer', 'name', 'trace_id', 'span_id', 'parent_id',
+                 'attributes', 'start', '_started')
+
+    sampled = True
+
+    def __init__(self, tracer: 'Tracer', name: str, trace_id: str,
+                 parent_id: str, attributes: dict) -> None:
+        """Создание span; замер начинается в __enter__."""
+        self._tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = _new_id()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = 0.0
+        self._started = 0
+
+    def set_attribute(self, key: str, value) -> None:
+        """Добавление атрибута span."""
+        self.attributes[key] = value
+
+    def __enter__(self) -> 'Span':
+        """Начало замера."""
+        _stack().append(self)
+        self.start = time.time()
+        self._started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        """Окончание замера и передача span экспортёру."""
+        duration_ns = time.perf_counter_ns() - self._started
+        _stack().pop()
+        if exc is not None:
+            self.attributes['error'] = repr(exc)
+        self._tracer.finish({
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': duration_ns / 1_000_000,
+            'attributes': self.attributes,
+        })
+
+
+class BatchExporter:
+    """
+    Пакетный экспорт span'ов из фонового потока.
+
+    Наследники реализуют write(batch)
+    """
+
+    def __init__(self, batch_size: int = TRACE_BATCH,
+                 flush_interval: float = TRACE_FLUSH_INTERVAL) -> None:
+        """Запуск фонового потока экспорта."""
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name='trace-exporter', daemon=True
+        )
+        self._thread.start()
+
+    def write(self, batch: list) -> None:
+        """Запись пачки span'ов."""
+        raise NotImplementedError
+
+    def export(self, span: dict) -> None:
+        """Постановка завершённого span в очередь экспорта."""
+        with self._lock:
+            self._buffer.append(span)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        """Запись накопленных span'ов."""
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        try:
+            self.write(batch)
+        except Exception as error:
+            logging.warning(f'Не удалось экспортировать трассировку: {error}')
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self) -> None:
+        """Остановка фонового потока и запись остатка."""
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+
+
+class JsonLinesExporter(BatchExporter):
+    """Экспорт span'ов в локальный JSON-lines файл."""
+
+    def __init__(self, path: str, **kwargs) -> None:
+        """Экспорт в файл path (дописывается)."""
+        self.path = path
+        super().__init__(**kwargs)
+
+    def write(self, batch: list) -> None:
+        """Дописывание пачки в файл, по строке на span."""
+        lines = ''.join(
+            json.dumps(span, ensure_ascii=False) + '\n' for span in batch
+        )
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(lines)
+
+
+class CollectorExporter(BatchExporter):
+    """Экспорт span'ов POST-запросом JSON-массива на коллектор."""
+
+    def __init__(self, url: str, timeout: float = 5, **kwargs) -> None:
+        """Экспорт на url через постоянную сессию."""
+        import requests
+
+        self.url = url
+        self.timeout = timeout
+        self._session = requests.Session()
+        super().__init__(**kwargs)
+
+    def write(self, batch: list) -> None:
+        """Отправка пачки на коллектор."""
+        response = self._session.post(
+            self.url, json=batch, timeout=self.timeout
+        )
+        response.raise_for_status()
+
+    def close(self) -> None:
+        """Запись остатка и закрытие сессии."""
+        super().close()
+        self._session.close()
+
+
+class Tracer:
+    """Создание span'ов с выборкой корневых итераций."""
+
+    def __init__(self, exporter: BatchExporter = None,
+                 sample_rate: float = 0.0) -> None:
+        """Без экспортёра трассировка выключена."""
+        self.configure(exporter, sample_rate)
+
+    def configure(self, exporter: BatchExporter = None,
+                  sample_rate: float = 0.0) -> None:
+        """Установка экспортёра и доли трассируемых итераций."""
+        self.exporter = exporter
+        self.sample_rate = sample_rate if exporter is not None else 0.0
+
+    @staticmethod
+    def current():
+        """Текущий span потока или None."""
+        stack = _stack()
+        return stack[-1] if stack else None
+
+    def span(self, name: str, parent=None, **attributes):
+        """
+        Span участка name.
+
+        Родитель - parent или текущий span потока; без родителя span
+        становится корневым и выбирается с вероятностью sample_rate
+        """
+        if parent is None:
+            parent = self.current()
+        if parent is None:
+            if not self.sample_rate or random.random() >= self.sample_rate:
+                return NOOP_SPAN
+            return Span(self, name, _new_id(), None, attributes)
+        if not parent.sampled:
+            return NOOP_SPAN
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+    def finish(self, span: dict) -> None:
+        """Передача завершённого span экспортёру."""
+        exporter = self.exporter
+        if exporter is not None:
+            exporter.export(span)
+
+    def close(self) -> None:
+        """Закрытие экспортёра и выключение трассировки."""
+        exporter = self.exporter
+        self.configure(None)
+        if exporter is not None:
+            exporter.close()
+
+
+tracer = Tracer()